@@ -1,13 +1,14 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
-from extensions import db, jwt_manager, mail
+from extensions import db, jwt_manager, mail, ORJSONProvider
 import os
 
 def create_app(config_class=Config):
     """Application factory"""
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = ORJSONProvider(app)
     
     # Initialize extensions
     db.init_app(app)
@@ -19,33 +20,38 @@ def create_app(config_class=Config):
     config_class.init_app(app)
     
     # Register blueprints
-    from routes.auth_routes import auth_bp
-    from routes.docs_routes import docs_bp
-    from routes.pipeline_routes import pipeline_bp
-    from routes.roadmap_routes import roadmap_bp
-    from routes.step_routes import step_bp
-    from routes.attempt_routes import attempt_bp
-    
-    app.register_blueprint(auth_bp, url_prefix="/api/auth")
-    app.register_blueprint(docs_bp, url_prefix="/api/docs")
-    app.register_blueprint(pipeline_bp, url_prefix="/api/pipeline")
-    app.register_blueprint(roadmap_bp, url_prefix="/api/roadmap")
-    app.register_blueprint(step_bp, url_prefix="/api/steps")
-    app.register_blueprint(attempt_bp, url_prefix="/api/attempts")
+    from routes import register_blueprints
+    register_blueprints(app)
     
     # Health check endpoint
     @app.route("/api/health")
     def health():
         return {"status": "ok", "message": "Revisify 2.0 API is running"}
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # One-time schema bootstrap: `flask --app app init-db`
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create database tables"""
+        create_tables(app)
+        print("Database tables created")
+    
+    # Opt-in table creation at startup (off by default so each new app/worker
+    # doesn't introspect the whole schema)
+    if app.config.get("CREATE_TABLES_ON_STARTUP"):
+        create_tables(app)
     
     return app
 
+def create_tables(app):
+    """Create all tables for the registered models"""
+    with app.app_context():
+        import models  # noqa: F401
+        db.create_all()
+
 if __name__ == "__main__":
+    # Development server only; production runs under gunicorn (see gunicorn_conf.py)
     app = create_app()
+    create_tables(app)
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_ENV") == "development"
     app.run(host="0.0.0.0", port=port, debug=debug)
@@ -1,6 +1,21 @@
 import os
 from pathlib import Path
 
+import orjson
+
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    """Put SQLite in WAL mode so readers don't block on an ingest transaction"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+def _json_dumps(obj):
+    """JSON column serializer (orjson; int question-number keys allowed)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 class Config:
     """Application configuration"""
     
@@ -12,6 +27,15 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "dev-secret-key-change-in-production"
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or f"sqlite:///{BACKEND_DIR}/revisify.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    CREATE_TABLES_ON_STARTUP = os.environ.get("REVISIFY_CREATE_TABLES", "false").lower() in ("1", "true")
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),  # ~ gunicorn threads per worker
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_pre_ping": True,  # drop stale connections before use
+        "pool_recycle": 1800,  # seconds
+        "pool_use_lifo": True,
+        "json_serializer": _json_dumps,  # JSON/JSONB columns (e.g. Attempt.answers_json)
+    }
     
     # JWT
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY") or SECRET_KEY
@@ -34,7 +58,7 @@ class Config:
     
     # File upload
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
-    ALLOWED_EXTENSIONS = {"pdf", "ppt", "pptx", "doc", "docx"}
+    ALLOWED_EXTENSIONS = frozenset({"pdf", "ppt", "pptx", "doc", "docx"})
     
     # LLM Configuration
     LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "openai")  # openai, anthropic, etc.
@@ -42,10 +66,14 @@ class Config:
     LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")  # or gpt-4, claude-3-haiku, etc.
     LLM_TEMPERATURE = float(os.environ.get("LLM_TEMPERATURE", 0.3))
     LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", 2000))
+    LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))  # parallel requests per batch
     
     # Embeddings
     EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     EMBEDDING_DIMENSION = int(os.environ.get("EMBEDDING_DIMENSION", 384))
+    EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 64))  # texts per encode forward pass
+    EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")  # torch, onnx, openvino
+    EMBEDDING_MODEL_FILE = os.environ.get("EMBEDDING_MODEL_FILE")  # e.g. onnx/model_qint8_avx512_vnni.onnx
     
     # Chunking
     CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", 1000))
@@ -78,4 +106,11 @@ class Config:
         Config.EXTRACTED_FOLDER.mkdir(parents=True, exist_ok=True)
         Config.INDICES_FOLDER.mkdir(parents=True, exist_ok=True)
         Config.EMBEDDINGS_FOLDER.mkdir(parents=True, exist_ok=True)
+        
+        # SQLite: WAL journal so readers don't block on an ingest write (writers still take turns)
+        if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+            from sqlalchemy import event
+            from extensions import db
+            with app.app_context():
+                event.listen(db.engine, "connect", _enable_sqlite_wal)
 
@@ -1,7 +1,11 @@
 """Flask extensions initialization"""
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from concurrent.futures import ThreadPoolExecutor
+import os
+import orjson
 
 # Database
 db = SQLAlchemy()
@@ -12,3 +16,30 @@ jwt_manager = JWTManager()
 # Mail
 mail = Mail()
 
+# Background jobs (document ingestion) run off the request thread.
+# Threads are only started on first submit, so this is safe to create before fork.
+background_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("BACKGROUND_WORKERS", 4)),
+    thread_name_prefix="revisify-bg"
+)
+
+# Outgoing mail gets its own small pool so SMTP sends never queue behind long ingest jobs
+mail_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revisify-mail")
+
+# JSON (orjson-backed provider for app.json)
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider using orjson; datetimes serialize to ISO 8601 natively"""
+    
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """jsonify(): hand orjson's bytes to the response without a str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
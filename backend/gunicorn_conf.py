@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration (production entry point).
+
+Usage (from backend/):
+    gunicorn -c gunicorn_conf.py "app:create_app()"
+
+Threaded workers overlap the blocking I/O in the LLM / parsing / SQL calls,
+and preload_app builds the app once in the master before forking workers.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 5))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))  # ingest/LLM calls can be slow
+
+
+def post_fork(server, worker):
+    """Give each worker its own connection pool instead of the master's.
+
+    close=False drops the inherited pool without closing its connections,
+    which the master process still owns.
+    """
+    from extensions import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -10,7 +10,8 @@ This is heuristic-based by design (fast + simple + works for MVP).
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
 import re
 
 
@@ -36,6 +37,20 @@ class PolicyConfig:
     # aggressive sanitization if leakage detected
     replace_on_violation: bool = True
 
+    # subject-specific phrase sets (precompiled once); None uses the built-in patterns
+    final_re: Optional[re.Pattern] = None
+    step_re: Optional[re.Pattern] = None
+
+    @classmethod
+    def build(cls, final_phrases: List[str], step_phrases: List[str], **kwargs) -> "PolicyConfig":
+        """Compile literal phrase lists once; reuse the config across hints."""
+        def compile_phrases(phrases: List[str]) -> Optional[re.Pattern]:
+            if not phrases:
+                return None
+            return re.compile("|".join(map(re.escape, phrases)), re.IGNORECASE | re.MULTILINE)
+
+        return cls(final_re=compile_phrases(final_phrases), step_re=compile_phrases(step_phrases), **kwargs)
+
 
 @dataclass
 class PolicyResult:
@@ -47,7 +62,10 @@ class PolicyResult:
     violation: bool = False
 
 
-_FINAL_PATTERNS = [
+_PATTERN_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Final-answer language (raw list kept for debugging; matched via _FINAL_RE)
+_FINAL_PATTERNS_RAW: Tuple[str, ...] = (
     r"\bfinal answer\b",
     r"\bthe answer is\b",
     r"\bhere(’|')?s the solution\b",
@@ -59,48 +77,135 @@ _FINAL_PATTERNS = [
     r"\bentire code\b",
     r"\bhere's the code\b",
     r"\bthis will solve\b",
-]
+)
 
 # Step-by-step / full derivation patterns
-_STEP_PATTERNS = [
+_STEP_PATTERNS_RAW: Tuple[str, ...] = (
     r"^\s*step\s*\d+\s*[:.)-]",
     r"^\s*\d+\s*[.)-]\s+",  # numbered list
     r"\bfirst,\b.*\bsecond,\b.*\bthird,\b",
     r"\btherefore\b.*\bthus\b",
     r"\bproof\b.*\bq\.?e\.?d\.?\b",
-]
+)
+
+
+def _alternation(patterns: Tuple[str, ...]) -> re.Pattern:
+    # One compiled alternation: a single search() walks the text once
+    return re.compile("|".join(f"(?:{p})" for p in patterns), _PATTERN_FLAGS)
+
+
+_FINAL_RE = _alternation(_FINAL_PATTERNS_RAW)
+_STEP_RE = _alternation(_STEP_PATTERNS_RAW)
+
+# Substring prefilters: every final/step pattern needs one of these words (or,
+# for numbered lists, a line starting with a digit). Only trusted for ASCII text,
+# where lower() agrees with IGNORECASE; anything else goes straight to the regex.
+_FINAL_TRIGGERS: Tuple[str, ...] = ("answer", "solution", "code", "full", "solve")
+_STEP_TRIGGERS: Tuple[str, ...] = ("step", "first", "proof", "therefore")
+
+
+def _has_numbered_line(text: str) -> bool:
+    # Prefix check per line; split on "\n" only, matching "^" under MULTILINE
+    return any(line.lstrip()[:1].isdigit() for line in text.split("\n"))
+
+
+def _has_final_language(text: str, low: Optional[str] = None, pattern: Optional[re.Pattern] = None) -> bool:
+    if pattern is not None:
+        # Custom phrase sets have no trigger list, so they always run the regex
+        return pattern.search(text) is not None
+    if text.isascii():
+        low = text.lower() if low is None else low
+        if not any(t in low for t in _FINAL_TRIGGERS):
+            return False
+    return _FINAL_RE.search(text) is not None
+
+
+def _has_step_pattern(text: str, low: Optional[str] = None, pattern: Optional[re.Pattern] = None) -> bool:
+    if pattern is not None:
+        return pattern.search(text) is not None
+    if text.isascii():
+        low = text.lower() if low is None else low
+        if not any(t in low for t in _STEP_TRIGGERS) and not _has_numbered_line(text):
+            return False
+    return _STEP_RE.search(text) is not None
 
 # Code block patterns (triple backticks) + inline code fences
 _CODE_BLOCK_RE = re.compile(r"```[\s\S]*?```", re.MULTILINE)
 _INLINE_CODE_RE = re.compile(r"`[^`]{20,}`")  # long inline code
 
 
-def _contains_any_pattern(text: str, patterns: List[str], multiline: bool = True) -> bool:
-    flags = re.IGNORECASE | (re.MULTILINE if multiline else 0)
-    for p in patterns:
-        if re.search(p, text, flags=flags):
-            return True
-    return False
+def _has_code_block(text: str) -> bool:
+    # A fenced block needs two fences; the substring gate is exact and skips the regex
+    first = text.find("```")
+    return first != -1 and text.find("```", first + 3) != -1
+
+# Sanitization helpers used on every hint
+_PARA_SPLIT_RE = re.compile(r"\n\s*\n")
+_ANSWER_STRIP_RE = re.compile(r"(?i)\b(final answer|the answer is|solution)\b.*")
+
 
+class _LeakScan(NamedTuple):
+    reasons: Tuple[str, ...]
+    final: bool
+    step: bool
+    code: bool
 
-def detect_solution_leakage(text: str) -> Tuple[bool, List[str]]:
+
+# Repeated responses (same topic re-asked) hit the cache; long texts bypass it
+_SCAN_CACHE_MAX_CHARS = 4096
+
+
+def _scan_leakage_uncached(
+    text: str,
+    final_re: Optional[re.Pattern] = None,
+    step_re: Optional[re.Pattern] = None,
+) -> _LeakScan:
+    low = text.lower()
+    final = _has_final_language(text, low, final_re)
+    step = _has_step_pattern(text, low, step_re)
+    code = _has_code_block(text)
     reasons: List[str] = []
-    if _contains_any_pattern(text, _FINAL_PATTERNS):
+    if final:
         reasons.append("final_answer_language")
-    if _contains_any_pattern(text, _STEP_PATTERNS):
+    if step:
         reasons.append("step_by_step_solution")
-    if _CODE_BLOCK_RE.search(text):
+    if code:
         reasons.append("code_block_present")
     # Very long response often indicates full solution dumping
     if len(text) > 2000:
         reasons.append("too_long")
-    return (len(reasons) > 0), reasons
+    return _LeakScan(tuple(reasons), final, step, code)
+
+
+_scan_leakage_cached = lru_cache(maxsize=512)(_scan_leakage_uncached)
+
+
+def _scan_leakage(
+    text: str,
+    final_re: Optional[re.Pattern] = None,
+    step_re: Optional[re.Pattern] = None,
+) -> _LeakScan:
+    """One detection pass; the per-pattern hits are returned for reuse."""
+    # Compiled patterns hash by source and flags, so they key the cache safely
+    if len(text) > _SCAN_CACHE_MAX_CHARS:
+        return _scan_leakage_uncached(text, final_re, step_re)
+    return _scan_leakage_cached(text, final_re, step_re)
+
+
+def detect_solution_leakage(text: str, cfg: Optional[PolicyConfig] = None) -> Tuple[bool, List[str]]:
+    if cfg is None:
+        reasons = _scan_leakage(text).reasons
+    else:
+        reasons = _scan_leakage(text, cfg.final_re, cfg.step_re).reasons
+    return (len(reasons) > 0), list(reasons)
 
 
 def _strip_code_blocks(text: str) -> Tuple[str, bool]:
-    new = _CODE_BLOCK_RE.sub("", text)
+    if "`" not in text:
+        return text, False
+    new = _CODE_BLOCK_RE.sub("", text) if _has_code_block(text) else text
     # also remove very long inline code
-    new2 = _INLINE_CODE_RE.sub("`[code omitted]`", new)
+    new2 = _INLINE_CODE_RE.sub("`[code omitted]`", new) if "`" in new else new
     return new2, (new2 != text)
 
 
@@ -108,22 +213,23 @@ def _shrink_code_blocks(text: str, max_code_chars: int) -> Tuple[str, bool]:
     """
     Keep code blocks but truncate each to max_code_chars.
     """
+    if not _has_code_block(text):
+        return text, False
     removed_any = False
 
     def _repl(m):
         nonlocal removed_any
         block = m.group(0)
-        # Preserve fence header
-        lines = block.splitlines()
-        if len(lines) <= 2:
+        # Preserve fence header (first line) and footer (last line); slice the body in place
+        header_end = block.find("\n")
+        footer_start = block.rfind("\n")
+        if header_end == footer_start:
+            return block
+        if footer_start - header_end - 1 <= max_code_chars:
             return block
-        header = lines[0]
-        footer = lines[-1]
-        body = "\n".join(lines[1:-1])
-        if len(body) > max_code_chars:
-            removed_any = True
-            body = body[:max_code_chars].rstrip() + "\n# ...snippet truncated..."
-        return "\n".join([header, body, footer])
+        removed_any = True
+        body = block[header_end + 1:header_end + 1 + max_code_chars].rstrip()
+        return block[:header_end + 1] + body + "\n# ...snippet truncated..." + block[footer_start:]
 
     out = _CODE_BLOCK_RE.sub(_repl, text)
     return out, removed_any
@@ -132,9 +238,11 @@ def _shrink_code_blocks(text: str, max_code_chars: int) -> Tuple[str, bool]:
 def _truncate_text(text: str, max_chars: int) -> Tuple[str, bool]:
     if len(text) <= max_chars:
         return text, False
-    # try cut at sentence boundary
+    # try cut at sentence boundary (last one in the back half of the window)
     cut = text[:max_chars]
-    m = re.search(r"(.+[.!?])\s", cut[::-1])
+    end = max(cut.rfind("."), cut.rfind("!"), cut.rfind("?"))
+    if end > max_chars * 0.5:
+        return cut[:end + 1] + "…", True
     # if we can't find boundary, hard cut
     return cut.rstrip() + "…", True
 
@@ -166,10 +274,6 @@ def enforce_hint_policy(
     """
     Enforce anti-spoonfeeding policy on LLM output for HINT mode.
     """
-    reasons: List[str] = []
-    violation, leak_reasons = detect_solution_leakage(model_text)
-    reasons.extend(leak_reasons)
-
     text = model_text
     truncated = False
     code_removed = False
@@ -182,18 +286,23 @@ def enforce_hint_policy(
         text, was_trunc = _truncate_text(text, min(cfg.max_hint_chars, 500))
         truncated = truncated or was_trunc
         # Remove "answer is" style phrases
-        text = re.sub(r"(?i)\b(final answer|the answer is|solution)\b.*", "", text).strip()
+        text = _ANSWER_STRIP_RE.sub("", text).strip()
         if not text:
             text = build_safe_hint_fallback(hint_no, cfg.hint_limit, topic)
             return PolicyResult(ok=True, text=text, reasons=["exam_mode_sanitized"], truncated=True)
         return PolicyResult(ok=True, text=text, reasons=["exam_mode_sanitized"], truncated=truncated, code_removed=code_removed)
 
+    # Detect once on the raw output; hits are reused while the text is unchanged
+    scan = _scan_leakage(model_text, cfg.final_re, cfg.step_re)
+    reasons: List[str] = list(scan.reasons)
+    violation = len(scan.reasons) > 0
+
     # Hint mode: block full solution language
-    if cfg.block_final_answers_in_hint_mode and _contains_any_pattern(text, _FINAL_PATTERNS):
+    if cfg.block_final_answers_in_hint_mode and scan.final:
         violation = True
 
     # Handle code
-    if _CODE_BLOCK_RE.search(text):
+    if scan.code:
         if not cfg.allow_code_in_hints:
             text, removed = _strip_code_blocks(text)
             code_removed = code_removed or removed
@@ -201,26 +310,30 @@ def enforce_hint_policy(
             text, shrunk = _shrink_code_blocks(text, cfg.max_code_chars)
             code_removed = code_removed or shrunk
 
+    # Code handling only rewrites text when it reports a change
+    step_hit = _has_step_pattern(text, pattern=cfg.step_re) if code_removed else scan.step
+
     # Block step-by-step dumps by stripping numbered steps beyond 2-3 lines
-    if cfg.block_step_by_step_in_hint_mode and _contains_any_pattern(text, _STEP_PATTERNS):
+    if cfg.block_step_by_step_in_hint_mode and step_hit:
         # Keep only first ~2 paragraphs, then force micro-question
-        parts = re.split(r"\n\s*\n", text)
-        text = "\n\n".join(parts[:2]).strip()
+        parts = _PARA_SPLIT_RE.split(text, maxsplit=2)
+        text = "\n\n".join(parts[:2])
         violation = True
         reasons.append("step_by_step_trimmed")
 
-    # Truncate hint length
+    # Truncate hint length (the one strip; truncation never re-adds trailing space)
     text, was_trunc = _truncate_text(text.strip(), cfg.max_hint_chars)
     truncated = truncated or was_trunc
 
     # Ensure it ends with a micro-question style prompt
-    if not re.search(r"[?]\s*$", text):
-        text = text.rstrip() + "\n\nMicro-question: What do you think is the next step?"
+    if not text.endswith("?"):
+        text = text + "\n\nMicro-question: What do you think is the next step?"
 
     if violation and cfg.replace_on_violation:
         # Replace with a safe fallback if the text is still too revealing
-        # (e.g., contains "final answer" even after edits)
-        if _contains_any_pattern(text, _FINAL_PATTERNS) or len(text) > cfg.max_hint_chars:
+        # (e.g., contains "final answer" even after edits). A truncated hint is always
+        # replaced: the sentence-boundary cut can leave it under max_hint_chars.
+        if truncated or _has_final_language(text, pattern=cfg.final_re) or len(text) > cfg.max_hint_chars:
             text = build_safe_hint_fallback(hint_no, cfg.hint_limit, topic)
             return PolicyResult(
                 ok=True,
@@ -258,7 +371,7 @@ def enforce_explanation_policy(
     truncated = truncated or was_trunc
 
     # Keep code blocks but shrink if huge
-    if _CODE_BLOCK_RE.search(text):
+    if _has_code_block(text):
         text, shrunk = _shrink_code_blocks(text, max(cfg.max_code_chars * 3, 1200))
         if shrunk:
             reasons.append("code_blocks_truncated")
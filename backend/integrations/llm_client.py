@@ -1,7 +1,48 @@
+import hashlib
 import os
-import json
+import re
+import threading
+from itertools import islice
+import orjson
+from cachetools import LRUCache
 from config import Config
 
+# Markdown code fence around a JSON payload (closing fence optional)
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)(?:```|\Z)", re.IGNORECASE)
+
+
+# Output budgets for short-answer calls; generation stops server-side instead of
+# paying for (and downloading) tokens that would be thrown away
+HINT_MAX_TOKENS = 300
+PREREQ_MAX_TOKENS = 200
+
+# Above this temperature answers are meant to vary, so the response caches below
+# (prerequisites, concepts, MCQs) are bypassed
+CACHE_MAX_TEMPERATURE = 0.3
+
+# Prerequisite answers keyed by (provider, model, concept, description, concept list);
+# re-runs and retries of the same document skip the LLM round trip
+_PREREQ_CACHE = LRUCache(maxsize=256)
+_PREREQ_CACHE_LOCK = threading.Lock()
+
+# Extracted concept lists keyed by (provider, model, digest of the text sent);
+# re-ingesting or retrying the same document skips the largest LLM call
+_CONCEPT_CACHE = LRUCache(maxsize=64)
+_CONCEPT_CACHE_LOCK = threading.Lock()
+# Only this much of the document is sent to the LLM (and hashed for the cache key)
+CONCEPT_CONTEXT_CHARS = 8000
+
+# Generated MCQ lists keyed by (provider, model, concept, description, context digest,
+# question count); a concept shared by several roadmaps is only generated once
+_MCQ_CACHE = LRUCache(maxsize=256)
+_MCQ_CACHE_LOCK = threading.Lock()
+
+
+def _extract_json(response):
+    """Strip a markdown code fence from an LLM response, if present"""
+    m = _FENCE_RE.search(response)
+    return (m.group(1) if m else response).strip()
+
 class LLMClient:
     """Unified client for all LLM operations"""
     
@@ -14,8 +55,32 @@ class LLMClient:
         
         if not self.api_key:
             raise ValueError("LLM_API_KEY not set in environment or config")
+        
+        # Provider SDK clients, created on first use and reused so their HTTP
+        # connection pool (keep-alive TCP/TLS) survives across calls
+        self._openai_client = None
+        self._anthropic_client = None
+        self._client_lock = threading.Lock()
+    
+    def _get_openai_client(self):
+        """Return the shared OpenAI client"""
+        if self._openai_client is None:
+            with self._client_lock:
+                if self._openai_client is None:
+                    import openai
+                    self._openai_client = openai.OpenAI(api_key=self.api_key)
+        return self._openai_client
+    
+    def _get_anthropic_client(self):
+        """Return the shared Anthropic client"""
+        if self._anthropic_client is None:
+            with self._client_lock:
+                if self._anthropic_client is None:
+                    import anthropic
+                    self._anthropic_client = anthropic.Anthropic(api_key=self.api_key)
+        return self._anthropic_client
     
-    def _call_llm(self, prompt, system_prompt=None, temperature=None):
+    def _call_llm(self, prompt, system_prompt=None, temperature=None, max_tokens=None):
         """
         Generic LLM call method
         
@@ -23,22 +88,22 @@ class LLMClient:
             prompt: User prompt
             system_prompt: Optional system prompt
             temperature: Optional temperature override
+            max_tokens: Optional output token budget override
         
         Returns:
             str: LLM response text
         """
         if self.provider == "openai":
-            return self._call_openai(prompt, system_prompt, temperature)
+            return self._call_openai(prompt, system_prompt, temperature, max_tokens)
         elif self.provider == "anthropic":
-            return self._call_anthropic(prompt, system_prompt, temperature)
+            return self._call_anthropic(prompt, system_prompt, temperature, max_tokens)
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
     
-    def _call_openai(self, prompt, system_prompt=None, temperature=None):
+    def _call_openai(self, prompt, system_prompt=None, temperature=None, max_tokens=None):
         """Call OpenAI API"""
         try:
-            import openai
-            client = openai.OpenAI(api_key=self.api_key)
+            client = self._get_openai_client()
             
             messages = []
             if system_prompt:
@@ -49,7 +114,7 @@ class LLMClient:
                 model=self.model,
                 messages=messages,
                 temperature=temperature or self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=max_tokens or self.max_tokens
             )
             
             return response.choices[0].message.content
@@ -58,17 +123,16 @@ class LLMClient:
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
     
-    def _call_anthropic(self, prompt, system_prompt=None, temperature=None):
+    def _call_anthropic(self, prompt, system_prompt=None, temperature=None, max_tokens=None):
         """Call Anthropic (Claude) API"""
         try:
-            import anthropic
-            client = anthropic.Anthropic(api_key=self.api_key)
+            client = self._get_anthropic_client()
             
             system_msg = system_prompt or ""
             
             response = client.messages.create(
                 model=self.model,
-                max_tokens=self.max_tokens,
+                max_tokens=max_tokens or self.max_tokens,
                 temperature=temperature or self.temperature,
                 system=system_msg,
                 messages=[{"role": "user", "content": prompt}]
@@ -87,6 +151,27 @@ class LLMClient:
         Returns:
             List of dicts with 'name' and 'description'
         """
+        context = raw_text[:CONCEPT_CONTEXT_CHARS]
+        if self.temperature > CACHE_MAX_TEMPERATURE:
+            return self._extract_concepts_uncached(context)[0]
+        
+        digest = hashlib.blake2b(context.encode("utf-8"), digest_size=16).digest()
+        key = (self.provider, self.model, digest)
+        with _CONCEPT_CACHE_LOCK:
+            cached = _CONCEPT_CACHE.get(key)
+        if cached is None:
+            concepts, parsed = self._extract_concepts_uncached(context)
+            # Unparseable or empty answers are not cached, so a retry asks the model again
+            if not parsed or not concepts:
+                return concepts
+            cached = tuple(concepts)
+            with _CONCEPT_CACHE_LOCK:
+                _CONCEPT_CACHE[key] = cached
+        # Callers get their own dicts; canonicalization may edit them
+        return [dict(c) if isinstance(c, dict) else c for c in cached]
+    
+    def _extract_concepts_uncached(self, context):
+        """Run the extraction prompt; returns (concepts, parsed_as_json)"""
         system_prompt = """You are an expert at analyzing educational content and extracting key concepts.
         Identify the main concepts, topics, or learning objectives from the provided text.
         Return a JSON array of objects, each with 'name' (concept name) and 'description' (brief explanation).
@@ -94,7 +179,7 @@ class LLMClient:
         
         prompt = f"""Extract key concepts from the following document text:
 
-{raw_text[:8000]}  # Limit context
+{context}  # Limit context
 
 Return ONLY a valid JSON array, no additional text:
 [
@@ -107,29 +192,24 @@ Return ONLY a valid JSON array, no additional text:
         # Parse JSON response
         try:
             # Extract JSON from response (handle markdown code blocks)
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            concepts = json.loads(response)
+            response = _extract_json(response)
+            concepts = orjson.loads(response)
             if isinstance(concepts, list):
-                return concepts
+                return concepts, True
             else:
-                return []
-        except json.JSONDecodeError:
+                return [], False
+        except orjson.JSONDecodeError:
             # Fallback: try to extract concepts from text
-            return self._fallback_extract_concepts(response)
+            return self._fallback_extract_concepts(response), False
     
     def _fallback_extract_concepts(self, text):
         """Fallback extraction if JSON parsing fails"""
-        # Simple fallback - split by lines and extract
-        concepts = []
-        for line in text.split("\n"):
-            line = line.strip()
-            if line and len(line) > 3:
-                concepts.append({"name": line, "description": ""})
-        return concepts[:20]  # Limit
+        # Simple fallback - split by lines and extract (stop after the 20-item limit)
+        lines = (line.strip() for line in text.split("\n"))
+        return [
+            {"name": line, "description": ""}
+            for line in islice((line for line in lines if len(line) > 3), 20)
+        ]
     
     def infer_prerequisites(self, concept_name, concept_description, all_concepts):
         """
@@ -143,6 +223,24 @@ Return ONLY a valid JSON array, no additional text:
         Returns:
             List of prerequisite concept names (2-4 items)
         """
+        if self.temperature > CACHE_MAX_TEMPERATURE:
+            return self._infer_prerequisites_uncached(concept_name, concept_description, all_concepts)[0]
+        
+        key = (self.provider, self.model, concept_name, concept_description, tuple(all_concepts))
+        with _PREREQ_CACHE_LOCK:
+            cached = _PREREQ_CACHE.get(key)
+        if cached is None:
+            prereqs, parsed = self._infer_prerequisites_uncached(concept_name, concept_description, all_concepts)
+            # Unparseable answers are not cached, so a retry asks the model again
+            if not parsed:
+                return prereqs
+            cached = tuple(prereqs)
+            with _PREREQ_CACHE_LOCK:
+                _PREREQ_CACHE[key] = cached
+        return list(cached)
+    
+    def _infer_prerequisites_uncached(self, concept_name, concept_description, all_concepts):
+        """LLM round trip behind infer_prerequisites; returns (prereqs, parsed_as_json)"""
         system_prompt = """You are an expert at analyzing learning dependencies.
         Given a concept and a list of available concepts, identify which concepts are prerequisites.
         Prerequisites are foundational concepts that must be understood before learning the target concept.
@@ -157,26 +255,22 @@ Identify 2-4 prerequisites for "{concept_name}" from the available concepts.
 Return ONLY a JSON array of concept names, no additional text:
 ["Prerequisite 1", "Prerequisite 2", ...]"""
         
-        response = self._call_llm(prompt, system_prompt)
+        response = self._call_llm(prompt, system_prompt, max_tokens=PREREQ_MAX_TOKENS)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            prereqs = json.loads(response)
+            response = _extract_json(response)
+            prereqs = orjson.loads(response)
             if isinstance(prereqs, list):
                 # Filter to only include concepts that exist in all_concepts
-                return [p for p in prereqs if p in all_concepts][:4]
-            return []
-        except json.JSONDecodeError:
+                return [p for p in prereqs if p in all_concepts][:4], True
+            return [], False
+        except orjson.JSONDecodeError:
             # Fallback: extract from text
             prereqs = []
             for concept in all_concepts:
                 if concept.lower() in response.lower() and concept != concept_name:
                     prereqs.append(concept)
-            return prereqs[:4]
+            return prereqs[:4], False
     
     def generate_mcqs(self, concept_name, concept_description, document_context="", num_questions=7):
         """
@@ -185,13 +279,31 @@ Return ONLY a JSON array of concept names, no additional text:
         Returns:
             List of dicts with 'question', 'options' (dict), 'correct_answer', 'explanation'
         """
+        context_snippet = document_context[:2000] if document_context else ""
+        if self.temperature > CACHE_MAX_TEMPERATURE:
+            return self._generate_mcqs_uncached(concept_name, concept_description, context_snippet, num_questions)
+        
+        digest = hashlib.blake2b(context_snippet.encode("utf-8"), digest_size=16).digest()
+        key = (self.provider, self.model, concept_name, concept_description, digest, num_questions)
+        with _MCQ_CACHE_LOCK:
+            cached = _MCQ_CACHE.get(key)
+        if cached is None:
+            mcqs = self._generate_mcqs_uncached(concept_name, concept_description, context_snippet, num_questions)
+            # Failed generations are not cached, so the next request asks the model again
+            if not mcqs:
+                return mcqs
+            cached = tuple(mcqs)
+            with _MCQ_CACHE_LOCK:
+                _MCQ_CACHE[key] = cached
+        return list(cached)
+    
+    def _generate_mcqs_uncached(self, concept_name, concept_description, context_snippet, num_questions):
+        """LLM round trip behind generate_mcqs"""
         system_prompt = """You are an expert at creating educational multiple-choice questions.
         Create clear, well-structured MCQs that test understanding of the concept.
         Each question should have 4 options (A, B, C, D) with exactly one correct answer.
         Include a brief explanation for the correct answer."""
         
-        context_snippet = document_context[:2000] if document_context else ""
-        
         prompt = f"""Generate {num_questions} multiple-choice questions about: {concept_name}
 
 Description: {concept_description}
@@ -213,16 +325,12 @@ Return ONLY a valid JSON array:
         response = self._call_llm(prompt, system_prompt)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            mcqs = json.loads(response)
+            response = _extract_json(response)
+            mcqs = orjson.loads(response)
             if isinstance(mcqs, list):
                 return mcqs
             return []
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return []
     
     def generate_hint(self, concept_name, concept_description, hint_number, question_context="", previous_hints=None):
@@ -257,17 +365,13 @@ Return ONLY a JSON object:
   "micro_question": "A thought-provoking micro-question to encourage reflection"
 }}"""
         
-        response = self._call_llm(prompt, system_prompt)
+        response = self._call_llm(prompt, system_prompt, max_tokens=HINT_MAX_TOKENS)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            hint_data = json.loads(response)
+            response = _extract_json(response)
+            hint_data = orjson.loads(response)
             return hint_data
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {
                 "hint": "Think about the key principles involved. What foundational knowledge applies here?",
                 "micro_question": "What connections can you make between this concept and what you already know?"
@@ -301,14 +405,10 @@ Return ONLY a JSON object:
         response = self._call_llm(prompt, system_prompt)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            notes = json.loads(response)
+            response = _extract_json(response)
+            notes = orjson.loads(response)
             return notes
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {
                 "summary": f"{concept_name} is an important concept that builds on foundational knowledge.",
                 "explanation": f"Detailed explanation of {concept_name}: {concept_description}"
@@ -336,16 +436,12 @@ Return ONLY a JSON array:
         response = self._call_llm(prompt, system_prompt)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            cards = json.loads(response)
+            response = _extract_json(response)
+            cards = orjson.loads(response)
             if isinstance(cards, list):
                 return cards
             return []
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return []
     
     def rag_answer(self, question, context_chunks):
@@ -387,14 +483,10 @@ Return ONLY a JSON object:
         response = self._call_llm(prompt, system_prompt)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-            
-            answer_data = json.loads(response)
+            response = _extract_json(response)
+            answer_data = orjson.loads(response)
             return answer_data
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # Fallback: return answer without structured citations
             return {
                 "answer": response,
@@ -17,11 +17,15 @@ Note:
 
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import os
 import re
-import importlib
+import importlib.util
 import logging
 
 logger = logging.getLogger(__name__)
@@ -63,12 +67,19 @@ class OCRConfig:
     # If True, suppress errors and return best-effort
     best_effort: bool = True
 
+    # Pages OCR'd in parallel (each page is its own tesseract process)
+    concurrency: int = int(os.environ.get("OCR_CONCURRENCY", os.cpu_count() or 1))
 
+
+@lru_cache(maxsize=None)
 def _has_module(name: str) -> bool:
     return importlib.util.find_spec(name) is not None
 
 
+@lru_cache(maxsize=1)
 def _require_pytesseract():
+    # Cached: the version probe spawns a tesseract process. Failures raise and
+    # are not cached, so a missing binary is re-checked on the next call.
     if not _has_module("pytesseract"):
         raise OCRUnavailableError(
             "pytesseract is not installed. Install it: pip install pytesseract"
@@ -96,28 +107,42 @@ def _load_image_pil(path: str):
     return Image.open(path)
 
 
+# Binarisation table for "L" images: p > 160 -> 255, else 0
+_THRESHOLD_LUT = [0] * 161 + [255] * 95
+
+
 def _preprocess_image(img):
     """Light preprocessing to improve OCR (grayscale + contrast + threshold)."""
     from PIL import ImageEnhance, ImageOps
 
-    # Ensure RGB -> L
-    img = img.convert("L")
+    # Already binary (e.g. a fax-style TIFF): nothing left to enhance
+    if img.mode == "1":
+        return img
+
+    # Ensure RGB -> L (rendered PDF pages already arrive as L; convert() would copy)
+    if img.mode != "L":
+        img = img.convert("L")
     img = ImageOps.autocontrast(img)
 
     # Contrast boost
     enhancer = ImageEnhance.Contrast(img)
     img = enhancer.enhance(1.8)
 
-    # Simple thresholding
-    img = img.point(lambda p: 255 if p > 160 else 0)
+    # Simple thresholding, straight to a 1-bit image: tesseract skips its own
+    # binarisation for monochrome input, and the handoff file is 8x smaller
+    img = img.point(_THRESHOLD_LUT, "1")
     return img
 
 
+_RE_WS = re.compile(r"[ \t]+")
+_RE_BLANKS = re.compile(r"\n{3,}")
+
+
 def _normalize_text(text: str) -> str:
     # collapse too many blank lines and spaces
-    text = re.sub(r"\r\n", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = text.replace("\r\n", "\n")
+    text = _RE_WS.sub(" ", text)
+    text = _RE_BLANKS.sub("\n\n", text)
     return text.strip()
 
 
@@ -133,6 +158,11 @@ def _ocr_image(img, cfg: OCRConfig) -> str:
             if not cfg.best_effort:
                 raise
 
+    # pytesseract hands each page to tesseract through a temp file, PNG unless the
+    # image says otherwise; uncompressed PNM skips a zlib encode + decode per page
+    if img.mode in ("1", "L", "RGB"):
+        img.format = "PPM"
+
     tesseract_config = f"--oem {cfg.oem} --psm {cfg.psm}"
     try:
         text = pytesseract.image_to_string(img, lang=cfg.lang, config=tesseract_config)
@@ -148,35 +178,38 @@ def _ocr_image(img, cfg: OCRConfig) -> str:
     return text
 
 
-def _pdf_to_images_pymupdf(pdf_path: str, dpi: int, start: Optional[int], end: Optional[int]):
+def _pdf_to_images_pymupdf(
+    pdf_path: str, dpi: int, start: Optional[int], end: Optional[int]
+) -> Iterator[Tuple[int, Any]]:
     """
     Render PDF pages to PIL images using PyMuPDF (fitz).
-    start/end are 1-indexed.
+    start/end are 1-indexed. Pages are yielded one at a time so memory is
+    bounded by the pages in flight, not the page count.
     """
     if not _has_module("fitz"):
         raise OCRUnavailableError("PyMuPDF not installed (fitz). Install: pip install pymupdf")
     from PIL import Image
     import fitz  # PyMuPDF
 
-    doc = fitz.open(pdf_path)
-    total_pages = doc.page_count
-
-    s = start if start is not None else 1
-    e = end if end is not None else total_pages
-    s = max(1, s)
-    e = min(total_pages, e)
+    with fitz.open(pdf_path) as doc:
+        total_pages = doc.page_count
 
-    zoom = dpi / 72.0  # PDF default 72dpi
-    mat = fitz.Matrix(zoom, zoom)
+        s = start if start is not None else 1
+        e = end if end is not None else total_pages
+        s = max(1, s)
+        e = min(total_pages, e)
 
-    images = []
-    for page_no in range(s, e + 1):
-        page = doc.load_page(page_no - 1)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-        images.append((page_no, img))
+        zoom = dpi / 72.0  # PDF default 72dpi
+        mat = fitz.Matrix(zoom, zoom)
 
-    return images
+        for page_no in range(s, e + 1):
+            page = doc.load_page(page_no - 1)
+            # OCR only needs luminance: rendering gray moves a third of the bytes
+            pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+            # frombytes copies the samples, so the pixmap can go before the yield
+            img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+            pix = None
+            yield page_no, img
 
 
 def _pdf_to_images_pdf2image(pdf_path: str, dpi: int, start: Optional[int], end: Optional[int]):
@@ -190,7 +223,7 @@ def _pdf_to_images_pdf2image(pdf_path: str, dpi: int, start: Optional[int], end:
     from pdf2image import convert_from_path
 
     # pdf2image uses first_page/last_page 1-indexed
-    kwargs = {"dpi": dpi}
+    kwargs = {"dpi": dpi, "grayscale": True}
     if start is not None:
         kwargs["first_page"] = start
     if end is not None:
@@ -230,28 +263,34 @@ def extract_text_from_pdf_ocr(pdf_path: str, cfg: Optional[OCRConfig] = None) ->
         raise FileNotFoundError(pdf_path)
 
     # Prefer PyMuPDF. Fallback to pdf2image.
-    images: List[Tuple[int, Any]] = []
+    images: Optional[Iterator[Tuple[int, Any]]] = None
     errors: List[str] = []
 
     try:
-        images = _pdf_to_images_pymupdf(pdf_path, cfg.dpi, cfg.start_page, cfg.end_page)
+        # The renderer is lazy: pull the first page to surface open/import errors
+        pages = _pdf_to_images_pymupdf(pdf_path, cfg.dpi, cfg.start_page, cfg.end_page)
+        first = next(pages, None)
+        if first is not None:
+            images = chain((first,), pages)
     except Exception as e:
         errors.append(f"PyMuPDF: {e}")
 
-    if not images:
+    if images is None:
         try:
-            images = _pdf_to_images_pdf2image(pdf_path, cfg.dpi, cfg.start_page, cfg.end_page)
+            rendered = _pdf_to_images_pdf2image(pdf_path, cfg.dpi, cfg.start_page, cfg.end_page)
+            if rendered:
+                images = iter(rendered)
         except Exception as e:
             errors.append(f"pdf2image: {e}")
 
-    if not images:
+    if images is None:
         raise OCRUnavailableError(
             "Unable to render PDF to images for OCR. Tried PyMuPDF and pdf2image.\n"
             + "\n".join(errors)
         )
 
-    out: List[Dict[str, Any]] = []
-    for page_no, img in images:
+    def ocr_page(page: Tuple[int, Any]) -> Dict[str, Any]:
+        page_no, img = page
         try:
             text = _ocr_image(img, cfg)
         except Exception as e:
@@ -260,7 +299,27 @@ def extract_text_from_pdf_ocr(pdf_path: str, cfg: Optional[OCRConfig] = None) ->
                 text = ""
             else:
                 raise
-        out.append({"loc": page_no, "text": text, "source": "ocr", "path": pdf_path})
+        return {"loc": page_no, "text": text, "source": "ocr", "path": pdf_path}
+
+    workers = max(1, cfg.concurrency)
+    if workers == 1:
+        return [ocr_page(page) for page in images]
+
+    # pytesseract waits on a tesseract subprocess (GIL released), so threads give
+    # real parallelism without pickling page images. One OpenMP thread per
+    # process keeps N concurrent tesseracts from oversubscribing the cores.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    out: List[Dict[str, Any]] = []
+    in_flight: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Render overlaps OCR, but at most 2x workers pages are held at once;
+        # draining the oldest future first keeps pages in order
+        for page in images:
+            if len(in_flight) >= 2 * workers:
+                out.append(in_flight.popleft().result())
+            in_flight.append(pool.submit(ocr_page, page))
+        while in_flight:
+            out.append(in_flight.popleft().result())
 
     return out
 
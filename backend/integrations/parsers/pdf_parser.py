@@ -44,21 +44,21 @@ class PDFParser:
         try:
             import pdfplumber
             
-            full_text = ""
+            text_parts = []
             pages_data = []
             
             with pdfplumber.open(filepath) as pdf:
                 for page_num, page in enumerate(pdf.pages, start=1):
                     text = page.extract_text()
                     if text:
-                        full_text += f"\n\n--- Page {page_num} ---\n\n{text}"
+                        text_parts.append(f"\n\n--- Page {page_num} ---\n\n{text}")
                         pages_data.append({
                             "page_number": page_num,
                             "text": text
                         })
             
             return {
-                "text": full_text.strip(),
+                "text": "".join(text_parts).strip(),
                 "pages": pages_data,
                 "total_pages": len(pages_data)
             }
@@ -72,20 +72,20 @@ class PDFParser:
             from pypdf import PdfReader
             
             reader = PdfReader(filepath)
-            full_text = ""
+            text_parts = []
             pages_data = []
             
             for page_num, page in enumerate(reader.pages, start=1):
                 text = page.extract_text()
                 if text:
-                    full_text += f"\n\n--- Page {page_num} ---\n\n{text}"
+                    text_parts.append(f"\n\n--- Page {page_num} ---\n\n{text}")
                     pages_data.append({
                         "page_number": page_num,
                         "text": text
                     })
             
             return {
-                "text": full_text.strip(),
+                "text": "".join(text_parts).strip(),
                 "pages": pages_data,
                 "total_pages": len(pages_data)
             }
@@ -103,6 +103,24 @@ class PDFParser:
         Returns:
             bool: True if PDF appears to be scanned
         """
+        try:
+            import fitz  # PyMuPDF: plain text without building pdfplumber's layout objects
+        except ImportError:
+            return self._is_scanned_pdfplumber(filepath)
+        
+        try:
+            with fitz.open(str(filepath)) as doc:
+                # Check first few pages
+                for page_index in range(min(3, doc.page_count)):
+                    text = doc.load_page(page_index).get_text("text")
+                    if text and len(text.strip()) > 50:
+                        return False  # Has extractable text
+                return True  # No extractable text, likely scanned
+        except Exception:
+            return False
+    
+    def _is_scanned_pdfplumber(self, filepath):
+        """Scan check via pdfplumber when PyMuPDF is not installed"""
         try:
             import pdfplumber
             
@@ -26,7 +26,7 @@ class PPTParser:
             raise ImportError("python-pptx not installed. Install with: pip install python-pptx")
 
         prs = Presentation(filepath)
-        full_text = ""
+        text_parts = []
         slides = []
 
         for slide_idx, slide in enumerate(prs.slides, start=1):
@@ -37,10 +37,10 @@ class PPTParser:
             slide_text = "\n".join(slide_text_parts).strip()
             if slide_text:
                 slides.append({"slide_number": slide_idx, "text": slide_text})
-                full_text += f"\n\n--- Slide {slide_idx} ---\n\n{slide_text}"
+                text_parts.append(f"\n\n--- Slide {slide_idx} ---\n\n{slide_text}")
 
         return {
-            "text": full_text.strip(),
+            "text": "".join(text_parts).strip(),
             "pages": slides,  # align with pdf parser format
             "total_pages": len(slides)
         }
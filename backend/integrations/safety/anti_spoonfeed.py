@@ -3,6 +3,10 @@ import re
 class AntiSpoonfeedFilter:
     """Filter to prevent full solutions in hint mode"""
     
+    # Every pattern below needs at least one of these words to match, so text
+    # without any of them can skip the regex work entirely
+    _FAST_TOKENS = ("answer", "solution", "therefore", "thus", "hence", "correct", "right")
+    
     def __init__(self):
         # Patterns that indicate full solutions
         self.solution_indicators = [
@@ -24,6 +28,21 @@ class AntiSpoonfeedFilter:
             (r"here's the solution:", "here's a hint:"),
             (r"the final answer", "a possible approach")
         ]
+        
+        # Precompiled patterns (case-insensitive) used by the filter methods
+        self._indicator_patterns = [
+            (indicator, re.compile(indicator, re.IGNORECASE))
+            for indicator in self.solution_indicators
+        ]
+        self._phrase_patterns = [
+            (re.compile(pattern, re.IGNORECASE), replacement)
+            for pattern, replacement in self.spoonfeed_phrases
+        ]
+        self._union_indicator = re.compile(
+            "|".join(f"(?:{indicator})" for indicator in self.solution_indicators),
+            re.IGNORECASE
+        )
+        self._direct_answer_pattern = re.compile(r"\b([A-D])\s+is\s+(correct|right|the answer)", re.IGNORECASE)
     
     def filter_hint(self, text):
         """
@@ -38,44 +57,51 @@ class AntiSpoonfeedFilter:
         if not text:
             return text
         
+        if not self._may_contain_solution(text):
+            return text.strip()
+        
         filtered = text
         
         # Replace spoonfeed phrases
-        for pattern, replacement in self.spoonfeed_phrases:
-            filtered = re.sub(pattern, replacement, filtered, flags=re.IGNORECASE)
-        
-        # Check for solution indicators
-        for indicator in self.solution_indicators:
-            if re.search(indicator, filtered, re.IGNORECASE):
-                # Remove or modify the solution part
-                # Try to keep the hint part but remove the answer
-                sentences = filtered.split(".")
-                filtered_sentences = []
-                for sentence in sentences:
-                    if not re.search(indicator, sentence, re.IGNORECASE):
-                        filtered_sentences.append(sentence)
-                    else:
-                        # Replace with guiding phrase
-                        filtered_sentences.append("Consider what you know about this concept.")
-                filtered = ". ".join(filtered_sentences)
+        for pattern, replacement in self._phrase_patterns:
+            filtered = pattern.sub(replacement, filtered)
+        
+        # Check for solution indicators; the union pattern rules out clean text in one
+        # search, then each matching indicator gets its own pass (later passes see the
+        # text rewritten by earlier ones)
+        if self._union_indicator.search(filtered):
+            for _, pattern in self._indicator_patterns:
+                if pattern.search(filtered):
+                    # Remove or modify the solution part
+                    # Try to keep the hint part but remove the answer
+                    sentences = filtered.split(".")
+                    for i, sentence in enumerate(sentences):
+                        if pattern.search(sentence):
+                            # Replace with guiding phrase
+                            sentences[i] = "Consider what you know about this concept."
+                    filtered = ". ".join(sentences)
         
         # Ensure hint doesn't end with explicit answers
         filtered = self._remove_trailing_answer(filtered)
         
         return filtered.strip()
     
+    def _may_contain_solution(self, text):
+        """Cheap substring prefilter run before any regex"""
+        # IGNORECASE also matches Unicode case variants (e.g. U+017F long s for "s"), which
+        # a lowercase substring test would miss, so only ASCII text is prefiltered
+        if not text.isascii():
+            return True
+        text_lower = text.lower()
+        return any(token in text_lower for token in self._FAST_TOKENS)
+    
     def _remove_trailing_answer(self, text):
         """Remove trailing answer statements"""
-        # Check last sentence for answer patterns
-        sentences = text.split(".")
-        if len(sentences) > 1:
-            last_sentence = sentences[-1].strip()
-            for indicator in self.solution_indicators:
-                if re.search(indicator, last_sentence, re.IGNORECASE):
-                    # Remove last sentence or replace with guiding phrase
-                    sentences = sentences[:-1]
-                    sentences.append("What connections can you make?")
-                    return ". ".join(sentences)
+        # Check last sentence for answer patterns (only the tail is inspected)
+        head, sep, last_sentence = text.rpartition(".")
+        if sep and self._union_indicator.search(last_sentence):
+            # Remove last sentence or replace with guiding phrase
+            return head.replace(".", ". ") + ". What connections can you make?"
         
         return text
     
@@ -88,13 +114,24 @@ class AntiSpoonfeedFilter:
         """
         issues = []
         
-        for indicator in self.solution_indicators:
-            if re.search(indicator, text, re.IGNORECASE):
-                issues.append(f"Contains solution indicator: {indicator}")
+        if not self._may_contain_solution(text):
+            return (True, issues)
+        
+        # Only report individual indicators once the union pattern has matched
+        if self._union_indicator.search(text):
+            for indicator, pattern in self._indicator_patterns:
+                if pattern.search(text):
+                    issues.append(f"Contains solution indicator: {indicator}")
         
         # Check for direct answer options
-        if re.search(r"\b([A-D])\s+is\s+(correct|right|the answer)", text, re.IGNORECASE):
+        if self._direct_answer_pattern.search(text):
             issues.append("Contains direct answer statement")
         
         return (len(issues) == 0, issues)
 
+
+# Shared instance: the filter only reads precompiled patterns, so one instance
+# is safe to use from every request thread.
+default_filter = AntiSpoonfeedFilter()
+filter_hint = default_filter.filter_hint
+validate_hint = default_filter.validate_hint
@@ -1,9 +1,42 @@
 """SQLAlchemy models for Revisify 2.0"""
 from extensions import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import JSONB
+from werkzeug.security import check_password_hash
+from passlib.context import CryptContext
+import numpy as np
+import hashlib
+import pickle
 import secrets
 
+# Password hashing: argon2 (C extension). Older werkzeug hashes still verify
+# and are upgraded on the next successful login.
+pwd_context = CryptContext(schemes=["argon2"], argon2__memory_cost=19456, argon2__rounds=2)
+_DUMMY_PASSWORD_HASH = pwd_context.hash(secrets.token_urlsafe(16))
+
+def hash_password(password):
+    """Hash a password with argon2"""
+    return pwd_context.hash(password)
+
+def verify_password(password_hash, password):
+    """Verify a password against an argon2 or legacy werkzeug hash"""
+    if password_hash.startswith("$argon2"):
+        return pwd_context.verify(password, password_hash)
+    return check_password_hash(password_hash, password)
+
+def password_needs_rehash(password_hash):
+    """True for legacy werkzeug hashes or outdated argon2 parameters"""
+    return not password_hash.startswith("$argon2") or pwd_context.needs_update(password_hash)
+
+def verify_dummy_password(password):
+    """Spend the same verify time when no user matched (avoids a timing oracle)"""
+    pwd_context.verify(password, _DUMMY_PASSWORD_HASH)
+    return False
+
+def content_hash(*parts):
+    """SHA-256 hex key over the inputs of an LLM generation (for sharing results)"""
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
 class User(db.Model):
     """User model"""
     __tablename__ = "users"
@@ -25,11 +58,11 @@ class User(db.Model):
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check password"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def generate_verification_token(self):
         """Generate email verification token"""
@@ -56,6 +89,39 @@ class Document(db.Model):
     concepts = db.relationship("Concept", back_populates="document", lazy="dynamic")
     roadmap_steps = db.relationship("RoadmapStep", back_populates="document", lazy="dynamic")
     prereq_edges = db.relationship("PrereqEdge", back_populates="document", lazy="dynamic")
+    
+    # Index for listing a user's documents newest-first
+    __table_args__ = (db.Index("ix_documents_user_created", "user_id", "created_at"),)
+    
+    @classmethod
+    def mark_status(cls, document_id, status, error_message=None):
+        """Set status/error_message with a single UPDATE (no ORM load/flush)"""
+        db.session.execute(
+            db.update(cls)
+            .where(cls.id == document_id)
+            .values(status=status, error_message=error_message)
+        )
+        db.session.commit()
+
+class Float16Vector(db.TypeDecorator):
+    """Embedding vector stored as packed float16 bytes (read back as a numpy array)"""
+    impl = db.LargeBinary
+    cache_ok = True
+    
+    # Not a valid pickle opcode, so rows written by the old PickleType column still load
+    MAGIC = b"\x00f16"
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.MAGIC + np.asarray(value, dtype=np.float16).tobytes()
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value[:len(self.MAGIC)] == self.MAGIC:
+            return np.frombuffer(value, dtype=np.float16, offset=len(self.MAGIC))
+        return np.asarray(pickle.loads(value), dtype=np.float32)
 
 class Chunk(db.Model):
     """Text chunk model"""
@@ -67,18 +133,21 @@ class Chunk(db.Model):
     page_number = db.Column(db.Integer)
     slide_number = db.Column(db.Integer)
     chunk_index = db.Column(db.Integer)  # Order within document
-    embedding = db.Column(db.PickleType)  # Store embedding vector
+    embedding = db.Column(Float16Vector)  # Store embedding vector (float16)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     document = db.relationship("Document", back_populates="chunks")
+    
+    # Index for walking a document's chunks in order
+    __table_args__ = (db.Index("ix_chunks_document_index", "document_id", "chunk_index"),)
 
 class Concept(db.Model):
     """Concept model"""
     __tablename__ = "concepts"
     
     id = db.Column(db.Integer, primary_key=True)
-    document_id = db.Column(db.Integer, db.ForeignKey("documents.id"), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey("documents.id"), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     canonical_name = db.Column(db.String(255))  # For deduplication
@@ -95,9 +164,9 @@ class PrereqEdge(db.Model):
     __tablename__ = "prereq_edges"
     
     id = db.Column(db.Integer, primary_key=True)
-    document_id = db.Column(db.Integer, db.ForeignKey("documents.id"), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey("documents.id"), nullable=False, index=True)
     concept_id = db.Column(db.Integer, db.ForeignKey("concepts.id"), nullable=False)
-    prerequisite_id = db.Column(db.Integer, db.ForeignKey("concepts.id"), nullable=False)
+    prerequisite_id = db.Column(db.Integer, db.ForeignKey("concepts.id"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -125,13 +194,16 @@ class RoadmapStep(db.Model):
     mcq_sets = db.relationship("MCQSet", back_populates="roadmap_step", lazy="dynamic")
     step_progresses = db.relationship("StepProgress", back_populates="roadmap_step", lazy="dynamic")
     hints = db.relationship("Hint", back_populates="roadmap_step", lazy="dynamic")
+    
+    # Index for step lookups by (document, concept)
+    __table_args__ = (db.Index("ix_roadmap_steps_document_concept", "document_id", "concept_id"),)
 
 class MCQSet(db.Model):
     """MCQ set model"""
     __tablename__ = "mcq_sets"
     
     id = db.Column(db.Integer, primary_key=True)
-    roadmap_step_id = db.Column(db.Integer, db.ForeignKey("roadmap_steps.id"), nullable=False)
+    roadmap_step_id = db.Column(db.Integer, db.ForeignKey("roadmap_steps.id"), nullable=False, index=True)
     question_count = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -158,6 +230,9 @@ class MCQ(db.Model):
     
     # Relationships
     mcq_set = db.relationship("MCQSet", back_populates="mcqs")
+    
+    # Index for fetching a set's questions in order
+    __table_args__ = (db.Index("ix_mcqs_set_question", "mcq_set_id", "question_number"),)
 
 class Attempt(db.Model):
     """MCQ attempt model"""
@@ -169,12 +244,15 @@ class Attempt(db.Model):
     score = db.Column(db.Float, nullable=False)  # 0.0 to 1.0
     correct_count = db.Column(db.Integer, nullable=False)
     total_count = db.Column(db.Integer, nullable=False)
-    answers_json = db.Column(db.Text)  # Store answers as JSON string
+    answers_json = db.Column(db.JSON().with_variant(JSONB(), "postgresql"))  # per-question results (JSONB on Postgres)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     user = db.relationship("User", back_populates="attempts")
     mcq_set = db.relationship("MCQSet", back_populates="attempts")
+    
+    # Index for a user's attempts on a set
+    __table_args__ = (db.Index("ix_attempts_user_set", "user_id", "mcq_set_id"),)
 
 class StepProgress(db.Model):
     """Step progress model"""
@@ -193,8 +271,11 @@ class StepProgress(db.Model):
     user = db.relationship("User", back_populates="step_progresses")
     roadmap_step = db.relationship("RoadmapStep", back_populates="step_progresses")
     
-    # Unique constraint
-    __table_args__ = (db.UniqueConstraint("user_id", "roadmap_step_id", name="unique_user_step_progress"),)
+    # Unique constraint; index for per-user concept lookups (mastery)
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "roadmap_step_id", name="unique_user_step_progress"),
+        db.Index("ix_step_progress_user_concept", "user_id", "concept_id"),
+    )
 
 class Hint(db.Model):
     """Hint model"""
@@ -211,6 +292,9 @@ class Hint(db.Model):
     # Relationships
     user = db.relationship("User", back_populates="hints")
     roadmap_step = db.relationship("RoadmapStep", back_populates="hints")
+    
+    # Index for counting and listing a user's hints on a step
+    __table_args__ = (db.Index("ix_hints_user_step", "user_id", "roadmap_step_id", "hint_number"),)
 
 class Note(db.Model):
     """Note/explanation model"""
@@ -220,6 +304,7 @@ class Note(db.Model):
     roadmap_step_id = db.Column(db.Integer, db.ForeignKey("roadmap_steps.id"), nullable=False)
     summary = db.Column(db.Text)
     explanation = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64), index=True)  # hash of the generation inputs
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -234,6 +319,7 @@ class Flashcard(db.Model):
     front = db.Column(db.Text, nullable=False)
     back = db.Column(db.Text, nullable=False)
     card_order = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64), index=True)  # hash of the generation inputs
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
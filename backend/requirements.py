@@ -7,6 +7,11 @@ REQUIREMENTS = [
     "Flask-CORS==4.0.0",
     "Werkzeug==3.0.1",
     "python-dotenv==1.0.0",
+    "gunicorn==21.2.0",
+    "cachetools==5.3.2",
+    "orjson==3.9.10",
+    "passlib==1.7.4",
+    "argon2-cffi==23.1.0",
     "pdfplumber==0.10.3",
     "pypdf==3.17.4",
     "python-pptx==0.6.23",
@@ -1,2 +1,22 @@
 """Routes package"""
 
+# (blueprint module, blueprint attribute, url prefix)
+BLUEPRINTS = (
+    ("routes.auth_routes", "auth_bp", "/api/auth"),
+    ("routes.docs_routes", "docs_bp", "/api/docs"),
+    ("routes.pipeline_routes", "pipeline_bp", "/api/pipeline"),
+    ("routes.roadmap_routes", "roadmap_bp", "/api/roadmap"),
+    ("routes.step_routes", "step_bp", "/api/steps"),
+    ("routes.attempt_routes", "attempt_bp", "/api/attempts"),
+)
+
+
+def register_blueprints(app):
+    """Register all API blueprints on app (safe to call more than once)"""
+    from importlib import import_module
+
+    for module_name, attr, url_prefix in BLUEPRINTS:
+        bp = getattr(import_module(module_name), attr)
+        if bp.name in app.blueprints:
+            continue
+        app.register_blueprint(bp, url_prefix=url_prefix)
@@ -1,15 +1,21 @@
 """Attempt and grading routes"""
+from functools import cache
 from flask import Blueprint, request, jsonify
-from routes.auth_routes import token_required
-from services.grading_service import GradingService
+from routes.auth_routes import identity_required
 
 
 attempt_bp = Blueprint("attempts", __name__)
-grading_service = GradingService()
+
+
+@cache
+def _grading_service():
+    """Lazily build the grading service on first use"""
+    from services.grading_service import GradingService
+    return GradingService()
 
 
 @attempt_bp.route("/submit", methods=["POST"])
-@token_required
+@identity_required
 def submit_attempt():
     """POST /api/attempts/submit - grade MCQ attempt"""
     try:
@@ -20,9 +26,9 @@ def submit_attempt():
         if not mcq_set_id or not isinstance(answers, dict):
             return jsonify({"error": "mcq_set_id and answers are required"}), 400
 
-        user = request.current_user
-        result = grading_service.grade_attempt(
-            user_id=user.id,
+        user_id = request.current_user_id
+        result = _grading_service().grade_attempt(
+            user_id=user_id,
             mcq_set_id=mcq_set_id,
             answers=answers
         )
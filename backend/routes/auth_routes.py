@@ -1,13 +1,49 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash
 from extensions import db, jwt_manager
-from models import User
+from models import User, hash_password, verify_password, password_needs_rehash, verify_dummy_password
 from services.auth_service import AuthService
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from functools import wraps
+from collections import namedtuple
+from cachetools import TTLCache
+import threading
 
 auth_bp = Blueprint("auth", __name__)
 auth_service = AuthService()
 
+# Per-process cache of authenticated users (user_id -> CurrentUser snapshot).
+# Handlers only read these fields, so a plain snapshot is cached rather than
+# an ORM instance bound to another request's session.
+CurrentUser = namedtuple("CurrentUser", ["id", "email", "name", "is_verified", "created_at"])
+_USER_CACHE = TTLCache(maxsize=4096, ttl=60)
+_USER_CACHE_LOCK = threading.Lock()
+
+def _load_current_user(user_id):
+    """Return a CurrentUser snapshot, hitting the DB only on cache miss"""
+    with _USER_CACHE_LOCK:
+        cached = _USER_CACHE.get(user_id)
+    if cached is not None:
+        return cached
+    
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    snapshot = CurrentUser(
+        id=user.id,
+        email=user.email,
+        name=user.name,
+        is_verified=user.is_verified,
+        created_at=user.created_at
+    )
+    with _USER_CACHE_LOCK:
+        _USER_CACHE[user_id] = snapshot
+    return snapshot
+
+def invalidate_user_cache(user_id):
+    """Drop a cached user snapshot after the user row changes"""
+    with _USER_CACHE_LOCK:
+        _USER_CACHE.pop(user_id, None)
+
 def token_required(f):
     """Decorator to protect routes requiring authentication"""
     @wraps(f)
@@ -24,10 +60,9 @@ def token_required(f):
             return jsonify({"error": "Token is missing"}), 401
         
         try:
-            from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
             verify_jwt_in_request()
             current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
+            current_user = _load_current_user(current_user_id)
             if not current_user:
                 return jsonify({"error": "User not found"}), 401
             request.current_user = current_user
@@ -37,6 +72,22 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def identity_required(f):
+    """Decorator for routes that only need the caller's user id (no DB lookup)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not request.headers.get("Authorization"):
+            return jsonify({"error": "Token is missing"}), 401
+        
+        try:
+            verify_jwt_in_request()
+            request.current_user_id = get_jwt_identity()
+        except Exception as e:
+            return jsonify({"error": "Token is invalid", "details": str(e)}), 401
+        
+        return f(*args, **kwargs)
+    return decorated
+
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
     """POST /api/auth/signup - Create new user account"""
@@ -50,8 +101,8 @@ def signup():
             return jsonify({"error": "Email and password are required"}), 400
         
         # Check if user exists
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user:
+        exists = db.session.query(db.exists().where(User.email == email)).scalar()
+        if exists:
             return jsonify({"error": "User with this email already exists"}), 409
         
         # Create user
@@ -79,9 +130,23 @@ def login():
         if not email or not password:
             return jsonify({"error": "Email and password are required"}), 400
         
-        user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        # Fetch only the columns needed to authenticate and issue the token
+        user = db.session.execute(
+            db.select(User.id, User.email, User.name, User.password_hash, User.is_verified)
+            .where(User.email == email)
+        ).first()
+        if not user:
+            verify_dummy_password(password)
             return jsonify({"error": "Invalid email or password"}), 401
+        if not verify_password(user.password_hash, password):
+            return jsonify({"error": "Invalid email or password"}), 401
+        
+        # Upgrade legacy hashes transparently
+        if password_needs_rehash(user.password_hash):
+            db.session.execute(
+                db.update(User).where(User.id == user.id).values(password_hash=hash_password(password))
+            )
+            db.session.commit()
         
         if not user.is_verified:
             return jsonify({"error": "Please verify your email before logging in"}), 403
@@ -107,6 +172,7 @@ def verify_email(token):
     try:
         user = auth_service.verify_email_token(token)
         if user:
+            invalidate_user_cache(user.id)
             return jsonify({"message": "Email verified successfully"}), 200
         else:
             return jsonify({"error": "Invalid or expired verification token"}), 400
@@ -128,6 +194,7 @@ def resend_verification():
             return jsonify({"error": "User not found"}), 404
         
         if user.is_verified:
+            invalidate_user_cache(user.id)
             return jsonify({"message": "Email already verified"}), 200
         
         auth_service.send_verification_email(user)
@@ -147,7 +214,7 @@ def get_current_user():
             "email": user.email,
             "name": user.name,
             "is_verified": user.is_verified,
-            "created_at": user.created_at.isoformat() if user.created_at else None
+            "created_at": user.created_at
         }), 200
     except Exception as e:
         return jsonify({"error": "Failed to get user", "details": str(e)}), 500
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import uuid
+from functools import cache
 from typing import Any, Dict
 
 from flask import Blueprint, current_app, jsonify, request
@@ -16,6 +17,17 @@ dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/api")
 # -------------------------
 # Helpers
 # -------------------------
+# Services are stateless; one instance per process is shared by all requests
+@cache
+def _dashboard_service() -> DashboardService:
+    return DashboardService()
+
+
+@cache
+def _auth_service() -> AuthService:
+    return AuthService()
+
+
 def _ok(data: Any, status: int = 200):
     return jsonify({"ok": True, "data": data}), status
 
@@ -78,7 +90,7 @@ def document_dashboard():
             return _err("Missing query param: document_id", 400, "VALIDATION_ERROR", {"req_id": req_id})
 
         document_id_i = _as_int(document_id, "document_id")
-        svc = DashboardService()
+        svc = _dashboard_service()
         data = svc.get_document_dashboard(user_id=user_id, document_id=document_id_i)
 
         if not isinstance(data, dict):
@@ -113,7 +125,7 @@ def dashboard_overview():
     req_id = str(uuid.uuid4())
     try:
         user_id = _get_identity_user_id()
-        svc = DashboardService()
+        svc = _dashboard_service()
         data = svc.get_overview(user_id=user_id)
 
         if not isinstance(data, dict):
@@ -139,7 +151,7 @@ def profile():
     req_id = str(uuid.uuid4())
     try:
         user_id = _get_identity_user_id()
-        auth = AuthService()
+        auth = _auth_service()
         user = auth.get_user_profile(user_id=user_id)
 
         if not isinstance(user, dict):
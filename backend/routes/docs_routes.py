@@ -1,18 +1,48 @@
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
-from extensions import db
+from extensions import db, background_pool
 from models import Document, User
-from routes.auth_routes import token_required
-from services.ingest_service import IngestService
-import os
+from routes.auth_routes import token_required, identity_required
+from functools import cache
+import secrets
+import shutil
 from pathlib import Path
 
 docs_bp = Blueprint("docs", __name__)
-ingest_service = IngestService()
+
+UPLOAD_COPY_BUFFER = 1 << 20  # 1 MiB writes instead of Werkzeug's 16 KiB chunks
+
+@cache
+def _ingest_service():
+    """Lazily build the ingest pipeline (loads embedding model, LLM client) on first use"""
+    from services.ingest_service import IngestService
+    return IngestService()
+
+def _process_document_in_background(app, document_id):
+    """Run the ingest pipeline for a document inside its own app context"""
+    with app.app_context():
+        try:
+            ingest_service = _ingest_service()
+        except Exception as e:
+            # Pipeline could not be built (e.g. model load failed): record it for status polling
+            app.logger.error(f"Processing error for doc {document_id}: {str(e)}")
+            Document.mark_status(document_id, "error", str(e))
+            return
+        
+        try:
+            ingest_service.process_document(document_id)
+        except Exception as e:
+            # process_document already rolled back and recorded the error on the document
+            app.logger.error(f"Processing error for doc {document_id}: {str(e)}")
+
+def file_extension(filename):
+    """Return the lowercased extension of a filename ("" if it has none)"""
+    dot = filename.rfind(".")
+    return filename[dot + 1:].lower() if dot != -1 else ""
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in current_app.config["ALLOWED_EXTENSIONS"]
+    return file_extension(filename) in current_app.config["ALLOWED_EXTENSIONS"]
 
 @docs_bp.route("/upload", methods=["POST"])
 @token_required
@@ -31,37 +61,35 @@ def upload_document():
                 "error": "Invalid file type",
                 "allowed_types": list(current_app.config["ALLOWED_EXTENSIONS"])
             }), 400
+        file_type = file_extension(file.filename)
         
-        user = request.current_user
+        # Writes a document owned by the caller, so the user row must exist (token_required)
+        user_id = request.current_user.id
         
         # Save file
         filename = secure_filename(file.filename)
-        timestamp = int(os.path.getmtime(file.filename) if os.path.exists(file.filename) else 0)
-        unique_filename = f"{user.id}_{timestamp}_{filename}"
+        unique_filename = f"{user_id}_{secrets.token_hex(8)}_{filename}"
         filepath = Path(current_app.config["UPLOAD_FOLDER"]) / unique_filename
-        file.save(str(filepath))
+        with open(filepath, "wb", buffering=0) as dst:
+            shutil.copyfileobj(file.stream, dst, length=UPLOAD_COPY_BUFFER)
         
         # Create document record
         document = Document(
-            user_id=user.id,
+            user_id=user_id,
             filename=filename,
             filepath=str(filepath),
-            file_type=filename.rsplit(".", 1)[1].lower(),
+            file_type=file_type,
             status="processing"
         )
         db.session.add(document)
         db.session.commit()
         
-        # Trigger processing pipeline (async in production, sync for now)
-        # In production, use Celery or similar task queue
-        try:
-            ingest_service.process_document(document.id)
-        except Exception as e:
-            # Log error but don't fail upload
-            current_app.logger.error(f"Processing error for doc {document.id}: {str(e)}")
-            document.status = "error"
-            document.error_message = str(e)
-            db.session.commit()
+        # Process in the background; clients poll /status/<doc_id>
+        background_pool.submit(
+            _process_document_in_background,
+            current_app._get_current_object(),
+            document.id
+        )
         
         return jsonify({
             "message": "Document uploaded successfully",
@@ -69,7 +97,7 @@ def upload_document():
                 "id": document.id,
                 "filename": document.filename,
                 "status": document.status,
-                "created_at": document.created_at.isoformat() if document.created_at else None
+                "created_at": document.created_at
             }
         }), 201
     
@@ -78,12 +106,25 @@ def upload_document():
         return jsonify({"error": "Upload failed", "details": str(e)}), 500
 
 @docs_bp.route("/list", methods=["GET"])
-@token_required
+@identity_required
 def list_documents():
     """GET /api/docs/list - List all documents for current user"""
     try:
-        user = request.current_user
-        documents = Document.query.filter_by(user_id=user.id).order_by(Document.created_at.desc()).all()
+        user_id = request.current_user_id
+        # Select only the listed columns; rows skip ORM hydration
+        documents = db.session.execute(
+            db.select(
+                Document.id,
+                Document.filename,
+                Document.file_type,
+                Document.status,
+                Document.error_message,
+                Document.created_at,
+                Document.updated_at
+            )
+            .where(Document.user_id == user_id)
+            .order_by(Document.created_at.desc())
+        ).all()
         
         return jsonify({
             "documents": [{
@@ -92,8 +133,8 @@ def list_documents():
                 "file_type": doc.file_type,
                 "status": doc.status,
                 "error_message": doc.error_message,
-                "created_at": doc.created_at.isoformat() if doc.created_at else None,
-                "updated_at": doc.updated_at.isoformat() if doc.updated_at else None
+                "created_at": doc.created_at,
+                "updated_at": doc.updated_at
             } for doc in documents]
         }), 200
     
@@ -101,12 +142,12 @@ def list_documents():
         return jsonify({"error": "Failed to list documents", "details": str(e)}), 500
 
 @docs_bp.route("/<int:doc_id>", methods=["GET"])
-@token_required
+@identity_required
 def get_document(doc_id):
     """GET /api/docs/<doc_id> - Get document details"""
     try:
-        user = request.current_user
-        document = Document.query.filter_by(id=doc_id, user_id=user.id).first()
+        user_id = request.current_user_id
+        document = Document.query.filter_by(id=doc_id, user_id=user_id).first()
         
         if not document:
             return jsonify({"error": "Document not found"}), 404
@@ -117,20 +158,23 @@ def get_document(doc_id):
             "file_type": document.file_type,
             "status": document.status,
             "error_message": document.error_message,
-            "created_at": document.created_at.isoformat() if document.created_at else None,
-            "updated_at": document.updated_at.isoformat() if document.updated_at else None
+            "created_at": document.created_at,
+            "updated_at": document.updated_at
         }), 200
     
     except Exception as e:
         return jsonify({"error": "Failed to get document", "details": str(e)}), 500
 
 @docs_bp.route("/status/<int:doc_id>", methods=["GET"])
-@token_required
+@identity_required
 def get_document_status(doc_id):
     """GET /api/docs/status/<doc_id> - Get document processing status"""
     try:
-        user = request.current_user
-        document = Document.query.filter_by(id=doc_id, user_id=user.id).first()
+        user_id = request.current_user_id
+        # Polled while processing: fetch just the status columns
+        document = Document.query.with_entities(
+            Document.id, Document.status, Document.error_message
+        ).filter_by(id=doc_id, user_id=user_id).first()
         
         if not document:
             return jsonify({"error": "Document not found"}), 404
@@ -139,7 +183,7 @@ def get_document_status(doc_id):
             "id": document.id,
             "status": document.status,
             "error_message": document.error_message,
-            "progress": getattr(document, "processing_progress", None)  # If tracking progress
+            "progress": None  # Document has no progress column yet
         }), 200
     
     except Exception as e:
@@ -1,43 +1,59 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import case, exists, false, func, select
 from extensions import db
-from models import Document
-from routes.auth_routes import token_required
+from models import Document, Chunk, Concept, RoadmapStep
+from routes.auth_routes import identity_required
 
 pipeline_bp = Blueprint("pipeline", __name__)
 
+
+def _count_for_document(model, doc_id):
+    """Scalar subquery counting a model's rows for one document"""
+    return select(func.count()).select_from(model).where(model.document_id == doc_id).scalar_subquery()
+
 @pipeline_bp.route("/status/<int:doc_id>", methods=["GET"])
-@token_required
+@identity_required
 def get_pipeline_status(doc_id):
     """GET /api/pipeline/status/<doc_id> - Get processing pipeline status"""
     try:
-        user = request.current_user
-        document = Document.query.filter_by(id=doc_id, user_id=user.id).first()
+        user_id = request.current_user_id
+        # Document plus chunk/concept existence in one round trip. The probes sit in
+        # CASE branches so the database only runs them when they can change a stage:
+        # chunking is already complete unless processing, concepts once ready.
+        row = db.session.query(
+            Document.status,
+            Document.error_message,
+            case((Document.status == "processing", exists().where(Chunk.document_id == doc_id)), else_=false()),
+            case((Document.status == "ready", false()), else_=exists().where(Concept.document_id == doc_id))
+        ).filter(Document.id == doc_id, Document.user_id == user_id).first()
         
-        if not document:
+        if not row:
             return jsonify({"error": "Document not found"}), 404
+        status, error_message, has_chunks, has_concepts = row
         
         # Return detailed pipeline status
+        ingest_stage = "pending" if status == "processing" else "completed"
+        concept_stage = "completed" if status == "ready" else "pending"
         status_info = {
-            "document_id": document.id,
-            "status": document.status,
-            "error_message": document.error_message,
+            "document_id": doc_id,
+            "status": status,
+            "error_message": error_message,
             "stages": {
                 "upload": "completed",
-                "extraction": "completed" if document.status != "processing" else "pending",
-                "chunking": "completed" if document.status != "processing" else "pending",
-                "embedding": "completed" if document.status != "processing" else "pending",
-                "indexing": "completed" if document.status != "processing" else "pending",
-                "concept_extraction": "completed" if document.status == "ready" else "pending",
-                "prereq_inference": "completed" if document.status == "ready" else "pending",
-                "roadmap_build": "completed" if document.status == "ready" else "pending"
+                "extraction": ingest_stage,
+                "chunking": ingest_stage,
+                "embedding": ingest_stage,
+                "indexing": ingest_stage,
+                "concept_extraction": concept_stage,
+                "prereq_inference": concept_stage,
+                "roadmap_build": concept_stage
             }
         }
         
         # If document has chunks/concepts, mark stages as completed
-        from models import Chunk, Concept
-        if Chunk.query.filter_by(document_id=doc_id).first():
+        if has_chunks:
             status_info["stages"]["chunking"] = "completed"
-        if Concept.query.filter_by(document_id=doc_id).first():
+        if has_concepts:
             status_info["stages"]["concept_extraction"] = "completed"
         
         return jsonify(status_info), 200
@@ -46,26 +62,27 @@ def get_pipeline_status(doc_id):
         return jsonify({"error": "Failed to get pipeline status", "details": str(e)}), 500
 
 @pipeline_bp.route("/progress/<int:doc_id>", methods=["GET"])
-@token_required
+@identity_required
 def get_pipeline_progress(doc_id):
     """GET /api/pipeline/progress/<doc_id> - Get detailed processing progress"""
     try:
-        user = request.current_user
-        document = Document.query.filter_by(id=doc_id, user_id=user.id).first()
+        user_id = request.current_user_id
+        # Document plus progress counts in one round trip (independent subqueries,
+        # so chunks and concepts are never joined against each other)
+        row = db.session.query(
+            Document.status,
+            _count_for_document(Chunk, doc_id),
+            _count_for_document(Concept, doc_id),
+            _count_for_document(RoadmapStep, doc_id)
+        ).filter(Document.id == doc_id, Document.user_id == user_id).first()
         
-        if not document:
+        if not row:
             return jsonify({"error": "Document not found"}), 404
-        
-        from models import Chunk, Concept, RoadmapStep
-        
-        # Count progress indicators
-        chunk_count = Chunk.query.filter_by(document_id=doc_id).count()
-        concept_count = Concept.query.filter_by(document_id=doc_id).count()
-        roadmap_step_count = RoadmapStep.query.join(Concept).filter(Concept.document_id == doc_id).count()
+        status, chunk_count, concept_count, roadmap_step_count = row
         
         progress = {
-            "document_id": document.id,
-            "status": document.status,
+            "document_id": doc_id,
+            "status": status,
             "progress_percentage": 0,
             "current_stage": "upload",
             "details": {
@@ -76,10 +93,10 @@ def get_pipeline_progress(doc_id):
         }
         
         # Calculate progress percentage
-        if document.status == "ready":
+        if status == "ready":
             progress["progress_percentage"] = 100
             progress["current_stage"] = "completed"
-        elif document.status == "error":
+        elif status == "error":
             progress["current_stage"] = "error"
         elif chunk_count > 0:
             if concept_count > 0:
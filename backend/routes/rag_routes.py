@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import uuid
+from functools import cache
 from typing import Any, Dict, Optional
 
 from flask import Blueprint, current_app, jsonify, request
@@ -15,6 +16,12 @@ rag_bp = Blueprint("rag", __name__, url_prefix="/api/rag")
 # -------------------------
 # Helpers
 # -------------------------
+# Services are stateless; one instance per process is shared by all requests
+@cache
+def _rag_service() -> RagService:
+    return RagService()
+
+
 def _ok(data: Any, status: int = 200):
     return jsonify({"ok": True, "data": data}), status
 
@@ -101,7 +108,7 @@ def rag_ask():
         if top_k < 1 or top_k > 20:
             return _err("top_k must be between 1 and 20", 400, "VALIDATION_ERROR", {"req_id": req_id})
 
-        svc = RagService()
+        svc = _rag_service()
         result = svc.ask(
             user_id=user_id,
             document_id=document_id,
@@ -147,7 +154,7 @@ def rag_history():
 
         limit_i = max(1, min(limit_i, 100))
 
-        svc = RagService()
+        svc = _rag_service()
         items = svc.history(user_id=user_id, document_id=document_id_i, limit=limit_i)
 
         return _ok({"items": items, "req_id": req_id})
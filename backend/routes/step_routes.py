@@ -1,42 +1,74 @@
 """Step routes for learning loop"""
+from functools import cache
 from flask import Blueprint, jsonify, request
-from routes.auth_routes import token_required
-from services.roadmap_service import RoadmapService
-from services.mcq_service import MCQService
-from services.notes_service import NotesService
-from services.flashcard_service import FlashcardService
-from services.tutor_service import TutorService
-from services.prereq_service import PrereqService
-from models import RoadmapStep, StepProgress
+from sqlalchemy.orm import joinedload
+from extensions import db
+from routes.auth_routes import identity_required
+from models import Document, RoadmapStep, StepProgress
 
 
 step_bp = Blueprint("steps", __name__)
-roadmap_service = RoadmapService()
-mcq_service = MCQService()
-notes_service = NotesService()
-flashcard_service = FlashcardService()
-tutor_service = TutorService()
-prereq_service = PrereqService()
+
+
+# Services are built on first use so importing the blueprint stays cheap
+@cache
+def _mcq_service():
+    from services.mcq_service import MCQService
+    return MCQService()
+
+
+@cache
+def _notes_service():
+    from services.notes_service import NotesService
+    return NotesService()
+
+
+@cache
+def _flashcard_service():
+    from services.flashcard_service import FlashcardService
+    return FlashcardService()
+
+
+@cache
+def _tutor_service():
+    from services.tutor_service import TutorService
+    return TutorService()
+
+
+@cache
+def _prereq_service():
+    from services.prereq_service import PrereqService
+    return PrereqService()
+
+
+def _get_user_step(step_id: int, user_id: int):
+    """Load a step owned by the user, with its concept, in a single query"""
+    return db.session.execute(
+        db.select(RoadmapStep)
+        .join(RoadmapStep.document)
+        .options(joinedload(RoadmapStep.concept))
+        .where(RoadmapStep.id == step_id, Document.user_id == user_id)
+    ).scalar_one_or_none()
 
 
 def _user_can_access_step(step: RoadmapStep, user_id: int) -> bool:
     """Check gating: prerequisites cleared or no prereqs"""
     if not step or not step.concept_id:
         return False
-    return prereq_service.check_prerequisites_cleared(step.concept_id, user_id)
+    return _prereq_service().check_prerequisites_cleared(step.concept_id, user_id)
 
 
 @step_bp.route("/<int:step_id>", methods=["GET"])
-@token_required
+@identity_required
 def get_step(step_id):
     """GET /api/steps/<step_id> - step metadata + progress"""
-    user = request.current_user
-    step = RoadmapStep.query.get(step_id)
-    if not step or step.document.user_id != user.id:
+    user_id = request.current_user_id
+    step = _get_user_step(step_id, user_id)
+    if not step:
         return jsonify({"error": "Step not found"}), 404
 
-    progress = StepProgress.query.filter_by(user_id=user.id, roadmap_step_id=step_id).first()
-    status = progress.status if progress else ("unlocked" if _user_can_access_step(step, user.id) else "locked")
+    progress = StepProgress.query.filter_by(user_id=user_id, roadmap_step_id=step_id).first()
+    status = progress.status if progress else ("unlocked" if _user_can_access_step(step, user_id) else "locked")
 
     return jsonify({
         "id": step.id,
@@ -49,84 +81,89 @@ def get_step(step_id):
 
 
 @step_bp.route("/<int:step_id>/mcqs", methods=["GET"])
-@token_required
+@identity_required
 def get_step_mcqs(step_id):
     """GET /api/steps/<step_id>/mcqs - returns/generates MCQ set"""
-    user = request.current_user
-    step = RoadmapStep.query.get(step_id)
-    if not step or step.document.user_id != user.id:
+    user_id = request.current_user_id
+    step = _get_user_step(step_id, user_id)
+    if not step:
         return jsonify({"error": "Step not found"}), 404
 
-    if not _user_can_access_step(step, user.id):
+    if not _user_can_access_step(step, user_id):
         return jsonify({"error": "Prerequisites not cleared yet"}), 403
 
     concept = step.concept
     if not concept:
         return jsonify({"error": "Concept missing for this step"}), 400
 
-    mcq_set = mcq_service.generate_mcq_set(
+    _mcq_service().generate_mcq_set(
         roadmap_step_id=step.id,
         concept_name=concept.name,
         concept_description=concept.description or "",
         document_context=""
     )
+    db.session.commit()
 
-    mcqs_payload = mcq_service.get_mcq_set_for_step(step.id)
+    mcqs_payload = _mcq_service().get_mcq_set_for_step(step.id)
     return jsonify({"mcq_set": mcqs_payload}), 200
 
 
 @step_bp.route("/<int:step_id>/notes", methods=["GET"])
-@token_required
+@identity_required
 def get_step_notes(step_id):
     """GET /api/steps/<step_id>/notes - returns/generates remediation notes if unlocked"""
-    user = request.current_user
-    step = RoadmapStep.query.get(step_id)
-    if not step or step.document.user_id != user.id:
+    user_id = request.current_user_id
+    step = _get_user_step(step_id, user_id)
+    if not step:
         return jsonify({"error": "Step not found"}), 404
 
     # Gating: allow notes if below threshold or hints exhausted
-    if not tutor_service.should_unlock_notes(user.id, step_id):
+    if not _tutor_service().should_unlock_notes(user_id, step_id):
         return jsonify({"error": "Notes locked. Use hints or submit attempt first."}), 403
 
     concept = step.concept
     if not concept:
         return jsonify({"error": "Concept missing for this step"}), 400
 
-    note = notes_service.get_or_generate_notes(
+    note = _notes_service().get_or_generate_notes(
         roadmap_step_id=step.id,
         concept_name=concept.name,
         concept_description=concept.description or "",
         document_context=""
     )
 
-    return jsonify({
+    payload = {
         "note": {
             "id": note.id,
             "summary": note.summary,
             "explanation": note.explanation
         }
-    }), 200
+    }
+    # Single commit per request, after the payload is read (commit expires loaded rows)
+    db.session.commit()
+    return jsonify(payload), 200
 
 
 @step_bp.route("/<int:step_id>/flashcards", methods=["GET"])
-@token_required
+@identity_required
 def get_step_flashcards(step_id):
     """GET /api/steps/<step_id>/flashcards - returns/generates flashcards"""
-    user = request.current_user
-    step = RoadmapStep.query.get(step_id)
-    if not step or step.document.user_id != user.id:
+    user_id = request.current_user_id
+    step = _get_user_step(step_id, user_id)
+    if not step:
         return jsonify({"error": "Step not found"}), 404
 
     concept = step.concept
     if not concept:
         return jsonify({"error": "Concept missing for this step"}), 400
 
-    flashcards = flashcard_service.get_or_generate_flashcards(
+    flashcards = _flashcard_service().get_or_generate_flashcards(
         roadmap_step_id=step.id,
         concept_name=concept.name,
         concept_description=concept.description or "",
         count=5
     )
+    db.session.commit()
 
     return jsonify({"flashcards": flashcards}), 200
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import uuid
+from functools import cache
 from typing import Any, Dict, Optional
 
 from flask import Blueprint, current_app, jsonify, request
@@ -18,6 +19,22 @@ tutor_bp = Blueprint("tutor", __name__, url_prefix="/api/tutor")
 # -------------------------
 # Helpers
 # -------------------------
+# Services are stateless; one instance per process is shared by all requests
+@cache
+def _tutor_service() -> TutorService:
+    return TutorService()
+
+
+@cache
+def _notes_service() -> NotesService:
+    return NotesService()
+
+
+@cache
+def _flashcard_service() -> FlashcardService:
+    return FlashcardService()
+
+
 HINT_LIMIT_DEFAULT = 3
 
 
@@ -128,7 +145,7 @@ def tutor_hint():
                 200,
             )
 
-        tutor = TutorService()
+        tutor = _tutor_service()
         result = tutor.generate_socratic_hint(
             user_id=user_id,
             document_id=document_id,
@@ -193,7 +210,7 @@ def tutor_attempt():
         student_attempt = str(_require(data, "student_attempt"))
         hint_no = _as_int(_require(data, "hint_no"), "hint_no")
 
-        tutor = TutorService()
+        tutor = _tutor_service()
         result = tutor.grade_micro_attempt(
             user_id=user_id,
             document_id=document_id,
@@ -234,7 +251,7 @@ def unlock_notes():
         document_id = _as_int(_require(data, "document_id"), "document_id")
         step_id = _as_int(_require(data, "step_id"), "step_id")
 
-        notes = NotesService()
+        notes = _notes_service()
         result = notes.unlock_or_generate_explanation(
             user_id=user_id,
             document_id=document_id,
@@ -272,7 +289,7 @@ def get_flashcards():
         document_id_i = _as_int(document_id, "document_id")
         step_id_i = _as_int(step_id, "step_id")
 
-        svc = FlashcardService()
+        svc = _flashcard_service()
         cards = svc.get_or_generate(
             user_id=user_id,
             document_id=document_id_i,
@@ -1,4 +1,5 @@
 """Chunking service"""
+from sqlalchemy import insert
 from extensions import db
 from models import Document, Chunk
 from config import Config
@@ -6,6 +7,10 @@ from config import Config
 class ChunkService:
     """Service for chunking document text"""
     
+    def __init__(self):
+        self.chunk_size = Config.CHUNK_SIZE
+        self.chunk_overlap = Config.CHUNK_OVERLAP
+    
     def create_chunks(self, document_id, parsed_data):
         """
         Create chunks from parsed document data
@@ -21,52 +26,37 @@ class ChunkService:
         if not document:
             raise ValueError(f"Document {document_id} not found")
         
-        chunks = []
-        chunk_index = 0
-        
-        # Chunk by pages if available
-        if "pages" in parsed_data and parsed_data["pages"]:
-            for page_data in parsed_data["pages"]:
-                page_text = page_data.get("text", "")
-                page_number = page_data.get("page_number", 0)
-                
-                # Split page text into chunks with overlap
-                page_chunks = self._chunk_text(
-                    text=page_text,
-                    chunk_size=Config.CHUNK_SIZE,
-                    overlap=Config.CHUNK_OVERLAP
-                )
-                
-                for chunk_text in page_chunks:
-                    chunk = Chunk(
-                        document_id=document_id,
-                        chunk_text=chunk_text,
-                        page_number=page_number,
-                        chunk_index=chunk_index
-                    )
-                    db.session.add(chunk)
-                    chunks.append(chunk)
-                    chunk_index += 1
+        # Chunk by pages if available, else the entire text as one "page"
+        if parsed_data.get("pages"):
+            pages = [(p.get("page_number", 0), p.get("text", "")) for p in parsed_data["pages"]]
         else:
-            # Fallback: chunk entire text
-            full_text = parsed_data.get("text", "")
-            text_chunks = self._chunk_text(
-                text=full_text,
-                chunk_size=Config.CHUNK_SIZE,
-                overlap=Config.CHUNK_OVERLAP
-            )
-            
-            for chunk_text in text_chunks:
-                chunk = Chunk(
-                    document_id=document_id,
-                    chunk_text=chunk_text,
-                    chunk_index=chunk_index
-                )
-                db.session.add(chunk)
-                chunks.append(chunk)
-                chunk_index += 1
+            pages = [(None, parsed_data.get("text", ""))]
+        
+        # Split each page into overlapping windows, then number chunks in one pass
+        page_chunks = [
+            (page_number, chunk_text)
+            for page_number, page_text in pages
+            for chunk_text in self._chunk_text(page_text, self.chunk_size, self.chunk_overlap)
+        ]
+        rows = [
+            {
+                "document_id": document_id,
+                "chunk_text": chunk_text,
+                "page_number": page_number,
+                "chunk_index": chunk_index
+            }
+            for chunk_index, (page_number, chunk_text) in enumerate(page_chunks)
+        ]
+        
+        if not rows:
+            return []
+        
+        # Batched INSERT ... RETURNING (insertmanyvalues) instead of one INSERT per ORM add
+        chunks = db.session.scalars(
+            insert(Chunk).returning(Chunk, sort_by_parameter_order=True),
+            rows
+        ).all()
         
-        db.session.commit()
         return chunks
     
     def _chunk_text(self, text, chunk_size, overlap):
@@ -84,16 +74,9 @@ class ChunkService:
         if len(text) <= chunk_size:
             return [text]
         
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
-            # Move start forward by (chunk_size - overlap)
-            start += chunk_size - overlap
+        # Move start forward by (chunk_size - overlap); always make progress
+        step = max(1, chunk_size - overlap)
         
-        return chunks
+        # One slice per window; each slice copies only chunk_size characters
+        return [text[start:start + chunk_size] for start in range(0, len(text), step)]
 
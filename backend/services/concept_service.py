@@ -1,8 +1,11 @@
+from sqlalchemy import insert
 from extensions import db
 from models import Document, Concept
 from integrations.llm_client import LLMClient
 import re
 
+_WS_RE = re.compile(r'\s+')
+
 class ConceptService:
     """Service for extracting and managing concepts from documents"""
     
@@ -30,19 +33,25 @@ class ConceptService:
         # Canonicalize and deduplicate
         canonicalized = self.canonicalize_concepts(concepts_data)
         
-        # Store concepts
-        concepts = []
-        for concept_data in canonicalized:
-            concept = Concept(
-                document_id=document_id,
-                name=concept_data["name"],
-                description=concept_data.get("description", ""),
-                canonical_name=concept_data.get("canonical_name", concept_data["name"])
-            )
-            db.session.add(concept)
-            concepts.append(concept)
+        rows = [
+            {
+                "document_id": document_id,
+                "name": concept_data["name"],
+                "description": concept_data.get("description", ""),
+                "canonical_name": concept_data.get("canonical_name", concept_data["name"])
+            }
+            for concept_data in canonicalized
+        ]
+        
+        if not rows:
+            return []
+        
+        # Store concepts: batched INSERT ... RETURNING (insertmanyvalues) instead of one INSERT per ORM add
+        concepts = db.session.scalars(
+            insert(Concept).returning(Concept, sort_by_parameter_order=True),
+            rows
+        ).all()
         
-        db.session.commit()
         return concepts
     
     def canonicalize_concepts(self, concepts_data):
@@ -55,6 +64,7 @@ class ConceptService:
         Returns:
             Deduplicated and canonicalized list
         """
+        # canonical name -> (lowercased name, entry); keys are lowered once, not per comparison
         canonical_map = {}
         canonicalized = []
         
@@ -64,26 +74,26 @@ class ConceptService:
                 continue
             
             # Normalize: lowercase, remove extra spaces
-            normalized = re.sub(r'\s+', ' ', name.lower().strip())
+            normalized = _WS_RE.sub(' ', name.lower())
             
             # Check for duplicates (simple approach - can be enhanced)
-            is_duplicate = False
-            for canonical_name, existing in canonical_map.items():
-                # Check similarity (simple substring check, can use fuzzy matching)
-                if normalized in canonical_name.lower() or canonical_name.lower() in normalized:
-                    # Merge into existing
-                    existing["description"] = existing.get("description", "") + " " + concept.get("description", "")
-                    is_duplicate = True
-                    break
+            existing = next(
+                (entry for key, entry in canonical_map.values() if normalized in key or key in normalized),
+                None
+            )
+            if existing is not None:
+                # Merge into existing
+                existing["description"] = existing.get("description", "") + " " + concept.get("description", "")
+                continue
             
-            if not is_duplicate:
-                canonical_name = name.title()  # Capitalize properly
-                canonical_map[canonical_name] = {
-                    "name": name,
-                    "canonical_name": canonical_name,
-                    "description": concept.get("description", "")
-                }
-                canonicalized.append(canonical_map[canonical_name])
+            canonical_name = name.title()  # Capitalize properly
+            entry = {
+                "name": name,
+                "canonical_name": canonical_name,
+                "description": concept.get("description", "")
+            }
+            canonical_map[canonical_name] = (canonical_name.lower(), entry)
+            canonicalized.append(entry)
         
         return canonicalized
     
@@ -1,4 +1,7 @@
 """Dashboard aggregation service"""
+from sqlalchemy import func
+
+from extensions import db
 from models import Document, RoadmapStep, StepProgress, Concept
 from services.mastery_service import MasteryService
 
@@ -15,25 +18,36 @@ class DashboardService:
         if not document:
             raise ValueError("Document not found")
 
-        steps = RoadmapStep.query.filter_by(document_id=document_id).all()
-        progress_rows = StepProgress.query.filter_by(user_id=user_id).all()
-
-        status_counts = {"cleared": 0, "unlocked": 0, "locked": 0}
-        mastery_scores = []
+        total_steps = db.session.scalar(
+            db.select(func.count(RoadmapStep.id)).where(RoadmapStep.document_id == document_id)
+        )
 
-        progress_map = {(p.roadmap_step_id): p for p in progress_rows}
+        # Status counts and mean mastery aggregated in SQL over this document's steps
+        progress_filter = (
+            StepProgress.user_id == user_id,
+            RoadmapStep.document_id == document_id,
+        )
+        status_rows = db.session.execute(
+            db.select(StepProgress.status, func.count())
+            .join(RoadmapStep, StepProgress.roadmap_step_id == RoadmapStep.id)
+            .where(*progress_filter)
+            .group_by(StepProgress.status)
+        ).all()
+        mean_mastery = db.session.scalar(
+            db.select(func.avg(StepProgress.mastery_score))
+            .join(RoadmapStep, StepProgress.roadmap_step_id == RoadmapStep.id)
+            .where(*progress_filter)
+        )
 
-        for step in steps:
-            prog = progress_map.get(step.id)
-            status = prog.status if prog else "locked"
-            status_counts[status] = status_counts.get(status, 0) + 1
-            if prog and prog.mastery_score is not None:
-                mastery_scores.append(prog.mastery_score)
+        status_counts = {"cleared": 0, "unlocked": 0, "locked": 0}
+        for status, count in status_rows:
+            status_counts[status] = status_counts.get(status, 0) + count
+        # Steps with no progress row yet count as locked
+        status_counts["locked"] += total_steps - sum(count for _, count in status_rows)
 
-        total_steps = len(steps)
         cleared = status_counts.get("cleared", 0)
         overall_progress = (cleared / total_steps) * 100 if total_steps else 0
-        overall_mastery = sum(mastery_scores) / len(mastery_scores) if mastery_scores else 0
+        overall_mastery = float(mean_mastery) if mean_mastery is not None else 0
 
         concept_count = Concept.query.filter_by(document_id=document_id).count()
 
@@ -1,14 +1,22 @@
 """Email service"""
 from flask import current_app
 from flask_mail import Message
-from extensions import mail
+from extensions import mail, mail_pool
 from config import Config
 
+def _send_in_background(app, msg):
+    """Deliver a message off the request thread (the SMTP exchange is slow)"""
+    with app.app_context():
+        try:
+            mail.send(msg)
+        except Exception as e:
+            app.logger.error(f"Failed to send email to {msg.recipients}: {str(e)}")
+
 class EmailService:
     """Service for sending emails"""
     
     def send_verification_email(self, recipient_email, verification_url):
-        """Send email verification link"""
+        """Queue email verification link (returns once the message is queued)"""
         try:
             msg = Message(
                 subject="Verify your Revisify 2.0 account",
@@ -33,7 +41,7 @@ Revisify 2.0 Team
 <p>If you didn't create this account, please ignore this email.</p>
 <p>Best regards,<br>Revisify 2.0 Team</p>
 """
-            mail.send(msg)
+            mail_pool.submit(_send_in_background, current_app._get_current_object(), msg)
             return True
         except Exception as e:
             current_app.logger.error(f"Failed to send verification email: {str(e)}")
@@ -1,24 +1,64 @@
 """Embedding service"""
+import importlib.util
+import logging
+from functools import cache
+from sqlalchemy import update
 from extensions import db
 from models import Chunk
 from config import Config
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+
+@cache
+def _load_model():
+    """Load the embedding model once per process; ingest and RAG share it"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        # Fallback: use a simple hash-based embedding (not recommended for production)
+        return None
+    
+    model = None
+    if Config.EMBEDDING_BACKEND != "torch":
+        # ONNX Runtime / OpenVINO run fused (optionally int8-quantized) kernels on CPU;
+        # sentence-transformers exports the model on first load and keeps the same encode() API
+        if importlib.util.find_spec("optimum") is None:
+            logger.warning(
+                f"EMBEDDING_BACKEND={Config.EMBEDDING_BACKEND} needs optimum; using the torch backend"
+            )
+        else:
+            try:
+                model_kwargs = {"file_name": Config.EMBEDDING_MODEL_FILE} if Config.EMBEDDING_MODEL_FILE else None
+                model = SentenceTransformer(
+                    Config.EMBEDDING_MODEL,
+                    backend=Config.EMBEDDING_BACKEND,
+                    model_kwargs=model_kwargs
+                )
+            except Exception as e:
+                # sentence-transformers raises a plain Exception for a missing backend extra
+                # (e.g. onnxruntime / optimum-intel), among other export/load failures
+                logger.warning(
+                    f"{Config.EMBEDDING_BACKEND} embedding backend failed, using torch: {str(e)}"
+                )
+    
+    if model is None:
+        model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        # The model already picks CUDA when present; fp16 weights double GPU matmul throughput
+        if model.device.type == "cuda":
+            model.half()
+    
+    # Warm-up pass so the first real query doesn't pay one-off kernel/graph setup
+    model.encode(["warmup"], show_progress_bar=False)
+    return model
+
+
 class EmbedService:
     """Service for generating embeddings"""
     
     def __init__(self):
-        self.model = None
-        self._load_model()
-    
-    def _load_model(self):
-        """Load embedding model"""
-        try:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(Config.EMBEDDING_MODEL)
-        except ImportError:
-            # Fallback: use a simple hash-based embedding (not recommended for production)
-            self.model = None
+        self.model = _load_model()
     
     def generate_embeddings(self, chunks):
         """
@@ -32,20 +72,29 @@ class EmbedService:
         
         if not self.model:
             # Fallback: create dummy embeddings
-            for chunk in chunks:
-                chunk.embedding = np.random.rand(Config.EMBEDDING_DIMENSION).tolist()
-            db.session.commit()
+            embeddings = np.random.rand(len(chunks), Config.EMBEDDING_DIMENSION)
+            self._store_embeddings(chunks, embeddings)
             return
         
         # Extract texts
         texts = [chunk.chunk_text for chunk in chunks]
         
         # Generate embeddings
-        embeddings = self.model.encode(texts, show_progress_bar=False)
+        # encode() length-sorts internally, so larger batches waste little on padding
+        embeddings = self.model.encode(
+            texts,
+            batch_size=Config.EMBED_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
         
-        # Store embeddings
-        for chunk, embedding in zip(chunks, embeddings):
-            chunk.embedding = embedding.tolist()
-        
-        db.session.commit()
+        self._store_embeddings(chunks, embeddings)
+    
+    def _store_embeddings(self, chunks, embeddings):
+        """Write embeddings as one bulk UPDATE by primary key (executemany) instead of per-object dirty tracking"""
+        embeddings = embeddings.astype(np.float16)
+        db.session.execute(
+            update(Chunk),
+            [{"id": chunk.id, "embedding": embedding} for chunk, embedding in zip(chunks, embeddings)]
+        )
 
@@ -1,6 +1,7 @@
 """Flashcard generation service"""
+from sqlalchemy import insert
 from extensions import db
-from models import Flashcard
+from models import Flashcard, content_hash
 from integrations.llm_client import LLMClient
 
 
@@ -19,24 +20,46 @@ class FlashcardService:
                 for card in existing
             ]
 
-        cards_data = self.llm_client.generate_flashcards(
-            concept_name=concept_name,
-            concept_description=concept_description,
-            num_cards=count
+        # Reuse cards generated for the same concept on another step before calling the LLM
+        key = content_hash(concept_name, concept_description, count)
+        source_step_id = db.session.scalar(
+            db.select(Flashcard.roadmap_step_id).where(Flashcard.content_hash == key).limit(1)
         )
-
-        flashcards = []
-        for idx, card in enumerate(cards_data):
-            fc = Flashcard(
-                roadmap_step_id=roadmap_step_id,
-                front=card.get("front", ""),
-                back=card.get("back", ""),
-                card_order=idx
+        if source_step_id is not None:
+            cards_data = [
+                {"front": front, "back": back}
+                for front, back in db.session.execute(
+                    db.select(Flashcard.front, Flashcard.back)
+                    .where(Flashcard.roadmap_step_id == source_step_id, Flashcard.content_hash == key)
+                    .order_by(Flashcard.card_order)
+                )
+            ]
+        else:
+            cards_data = self.llm_client.generate_flashcards(
+                concept_name=concept_name,
+                concept_description=concept_description,
+                num_cards=count
             )
-            db.session.add(fc)
-            flashcards.append(fc)
 
-        db.session.commit()
+        rows = [
+            {
+                "roadmap_step_id": roadmap_step_id,
+                "front": card.get("front", ""),
+                "back": card.get("back", ""),
+                "card_order": idx,
+                "content_hash": key
+            }
+            for idx, card in enumerate(cards_data)
+        ]
+        if not rows:
+            return []
+
+        flashcards = db.session.scalars(
+            insert(Flashcard).returning(Flashcard, sort_by_parameter_order=True),
+            rows
+        ).all()
+
+        # Caller commits
         return [
             {"id": card.id, "front": card.front, "back": card.back, "order": card.card_order}
             for card in flashcards
@@ -1,7 +1,9 @@
+from sqlalchemy import insert
 from extensions import db
-from models import MCQSet, MCQ, Attempt, StepProgress
+from models import MCQSet, MCQ, Attempt, StepProgress, RoadmapStep
 from services.mcq_service import MCQService
 from services.mastery_service import MasteryService
+from services.roadmap_service import RoadmapService
 from config import Config
 
 class GradingService:
@@ -10,6 +12,7 @@ class GradingService:
     def __init__(self):
         self.mcq_service = MCQService()
         self.mastery_service = MasteryService()
+        self.roadmap_service = RoadmapService()
     
     def grade_attempt(self, user_id, mcq_set_id, answers):
         """
@@ -23,28 +26,30 @@ class GradingService:
         Returns:
             Dict with score, results, and threshold status
         """
-        # Get correct answers
-        correct_answers = self.mcq_service.get_correct_answers(mcq_set_id)
-        
         # Get MCQ set
         mcq_set = MCQSet.query.get(mcq_set_id)
         if not mcq_set:
             raise ValueError(f"MCQ set {mcq_set_id} not found")
         
+        # Get correct answers
+        correct_answers = self.mcq_service.get_correct_answers(mcq_set_id)
+        
         total_questions = mcq_set.question_count
         correct_count = 0
         
         # Grade each answer
         results = {}
         for question_num, user_answer in answers.items():
+            user_answer = user_answer.upper()
+            # Answer keys are upper-cased and blank-free, so an unknown question never matches
             correct_answer = correct_answers.get(question_num)
-            is_correct = user_answer.upper() == correct_answer.upper() if correct_answer else False
+            is_correct = user_answer == correct_answer
             
             if is_correct:
                 correct_count += 1
             
             results[question_num] = {
-                "user_answer": user_answer.upper(),
+                "user_answer": user_answer,
                 "correct_answer": correct_answer,
                 "is_correct": is_correct
             }
@@ -56,23 +61,23 @@ class GradingService:
         threshold = Config.MCQ_THRESHOLD_SCORE
         passed = score >= threshold
         
-        # Save attempt
-        attempt = Attempt(
-            user_id=user_id,
-            mcq_set_id=mcq_set_id,
-            score=score,
-            correct_count=correct_count,
-            total_count=total_questions,
-            answers_json=str(results)  # Store as JSON string (or use JSON column if available)
-        )
-        db.session.add(attempt)
+        # Save attempt (Core insert: the row is write-only here, only its id is needed)
+        attempt_id = db.session.execute(
+            insert(Attempt).values(
+                user_id=user_id,
+                mcq_set_id=mcq_set_id,
+                score=score,
+                correct_count=correct_count,
+                total_count=total_questions,
+                answers_json=results
+            ).returning(Attempt.id)
+        ).scalar_one()
         
         # Update step progress
         roadmap_step_id = mcq_set.roadmap_step_id
-        self._update_step_progress(user_id, roadmap_step_id, score, passed)
+        unlocked_step_ids = self._update_step_progress(user_id, roadmap_step_id, score, passed)
         
         # Update mastery
-        from models import RoadmapStep
         roadmap_step = RoadmapStep.query.get(roadmap_step_id)
         if roadmap_step and roadmap_step.concept_id:
             self.mastery_service.update_mastery(
@@ -81,8 +86,13 @@ class GradingService:
                 score=score
             )
         
+        # One commit for the attempt, progress, unlocks and mastery
         db.session.commit()
         
+        # Newly unlocked steps are the next ones opened: have their MCQs ready
+        if unlocked_step_ids:
+            self.mcq_service.prefetch_mcq_sets(unlocked_step_ids)
+        
         return {
             "score": score,
             "correct_count": correct_count,
@@ -90,13 +100,11 @@ class GradingService:
             "passed": passed,
             "threshold": threshold,
             "results": results,
-            "attempt_id": attempt.id
+            "attempt_id": attempt_id
         }
     
     def _update_step_progress(self, user_id, roadmap_step_id, score, passed):
         """Update step progress based on attempt"""
-        from models import RoadmapStep
-        
         progress = StepProgress.query.filter_by(
             user_id=user_id,
             roadmap_step_id=roadmap_step_id
@@ -124,15 +132,15 @@ class GradingService:
         progress.mastery_score = score
         
         # Unlock next steps if cleared
+        unlocked_step_ids = []
         if passed:
-            from services.roadmap_service import RoadmapService
-            roadmap_service = RoadmapService()
             if progress.concept_id and roadmap_step:
-                roadmap_service.unlock_next_steps(
+                unlocked_step_ids = self.roadmap_service.unlock_next_steps(
                     document_id=roadmap_step.document_id,
                     user_id=user_id,
                     cleared_concept_id=progress.concept_id
                 )
         
         db.session.flush()
+        return unlocked_step_ids
 
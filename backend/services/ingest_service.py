@@ -1,7 +1,9 @@
 """Document ingestion service"""
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from flask import current_app
 from extensions import db
-from models import Document
+from models import Document, Chunk, Concept
 from integrations.parsers.pdf_parser import PDFParser
 from services.chunk_service import ChunkService
 from services.embed_service import EmbedService
@@ -9,6 +11,7 @@ from services.vector_store_service import VectorStoreService
 from services.concept_service import ConceptService
 from services.prereq_service import PrereqService
 from services.roadmap_service import RoadmapService
+from services.mcq_service import MCQService
 
 class IngestService:
     """Service for processing uploaded documents"""
@@ -21,6 +24,7 @@ class IngestService:
         self.concept_service = ConceptService()
         self.prereq_service = PrereqService()
         self.roadmap_service = RoadmapService()
+        self.mcq_service = MCQService()
     
     def process_document(self, document_id):
         """
@@ -43,31 +47,72 @@ class IngestService:
             
             raw_text = parsed_data.get("text", "")
             
-            # 2. Chunk text
-            chunks = self.chunk_service.create_chunks(document_id, parsed_data)
-            
-            # 3. Generate embeddings
-            self.embed_service.generate_embeddings(chunks)
-            
-            # 4. Build FAISS index
-            self.vector_store_service.build_index(document_id, chunks)
-            
-            # 5. Extract concepts
-            concepts = self.concept_service.extract_concepts(document_id, raw_text)
-            
-            # 6. Infer prerequisites
-            prereq_edges = self.prereq_service.infer_prerequisites(document_id, concepts)
-            
-            # 7. Build roadmap
-            roadmap_steps = self.roadmap_service.build_roadmap(document_id)
+            if db.engine.dialect.name == "sqlite":
+                # SQLite takes one writer at a time (WAL only frees readers), so
+                # two ingest threads would contend for the lock: run in turn
+                self._run_chunk_stages(document_id, parsed_data)
+                first_step_id = self._run_concept_stages(document_id, raw_text)
+            else:
+                # Steps 5-7 (LLM-bound) only need raw_text, so they run alongside
+                # steps 2-4 (chunk/embed/index). Leaving the with-block waits for both.
+                app = current_app._get_current_object()
+                with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-concepts") as pool:
+                    concept_stage = pool.submit(self._run_concept_stages_in_context, app, document_id, raw_text)
+                    self._run_chunk_stages(document_id, parsed_data)
+                    
+                    # Re-raise any concept/prereq/roadmap failure
+                    first_step_id = concept_stage.result()
             
             # 8. Mark document as ready
-            document.status = "ready"
-            db.session.commit()
+            Document.mark_status(document_id, "ready")
+            
+            # Every learner starts on the first step: generate its MCQs ahead of the
+            # first request, once both stages have committed (no competing writers)
+            if first_step_id is not None:
+                self.mcq_service.prefetch_mcq_sets([first_step_id])
             
         except Exception as e:
-            document.status = "error"
-            document.error_message = str(e)
-            db.session.commit()
+            db.session.rollback()
+            Document.mark_status(document_id, "error", str(e))
             raise
-
+    
+    def _run_chunk_stages(self, document_id, parsed_data):
+        """Chunking -> embeddings -> FAISS index"""
+        # 2. Chunk text (committed before encoding so no write transaction spans the model call)
+        self.chunk_service.create_chunks(document_id, parsed_data)
+        db.session.commit()
+        # Commit expired the returned rows; reload them in one query, not one per chunk
+        chunks = Chunk.query.filter_by(document_id=document_id).all()
+        
+        # 3. Generate embeddings
+        self.embed_service.generate_embeddings(chunks)
+        db.session.commit()
+        
+        # 4. Build FAISS index (file writes only, outside the transaction)
+        self.vector_store_service.build_index(document_id)
+    
+    def _run_concept_stages(self, document_id, raw_text):
+        """Concept extraction -> prerequisite inference -> roadmap; returns the first step's ID"""
+        # 5. Extract concepts (committed before the prerequisite LLM fan-out)
+        self.concept_service.extract_concepts(document_id, raw_text)
+        db.session.commit()
+        concepts = Concept.query.filter_by(document_id=document_id).all()
+        
+        # 6. Infer prerequisites
+        self.prereq_service.infer_prerequisites(document_id, concepts)
+        
+        # 7. Build roadmap
+        roadmap_steps = self.roadmap_service.build_roadmap(document_id)
+        # Read before commit expires the row (the ID is needed across sessions)
+        first_step_id = roadmap_steps[0].id if roadmap_steps else None
+        db.session.commit()
+        return first_step_id
+    
+    def _run_concept_stages_in_context(self, app, document_id, raw_text):
+        """_run_concept_stages on a worker thread (own app context/session)"""
+        with app.app_context():
+            try:
+                return self._run_concept_stages(document_id, raw_text)
+            except Exception:
+                db.session.rollback()
+                raise
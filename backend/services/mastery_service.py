@@ -1,6 +1,7 @@
 """Mastery tracking service"""
+from sqlalchemy import and_, func
 from extensions import db
-from models import StepProgress, Concept
+from models import StepProgress, Concept, RoadmapStep
 
 class MasteryService:
     """Service for updating and tracking mastery scores"""
@@ -25,7 +26,6 @@ class MasteryService:
             progress.mastery_score = max(progress.mastery_score or 0.0, score)
         else:
             # Create new progress entry
-            from models import RoadmapStep
             roadmap_step = RoadmapStep.query.filter_by(concept_id=concept_id).first()
             if roadmap_step:
                 progress = StepProgress(
@@ -37,7 +37,8 @@ class MasteryService:
                 )
                 db.session.add(progress)
         
-        db.session.commit()
+        # Caller commits (grading writes attempt + progress in one transaction)
+        db.session.flush()
     
     def get_mastery_for_concept(self, user_id, concept_id):
         """Get mastery score for a concept"""
@@ -50,19 +51,14 @@ class MasteryService:
     
     def get_overall_mastery(self, user_id, document_id):
         """Get overall mastery for a document"""
-        from models import Concept, RoadmapStep
+        # One aggregate instead of a progress lookup per concept; concepts the
+        # user has no progress on count as 0.0
+        overall = db.session.query(
+            func.avg(func.coalesce(StepProgress.mastery_score, 0.0))
+        ).select_from(Concept).outerjoin(
+            StepProgress,
+            and_(StepProgress.concept_id == Concept.id, StepProgress.user_id == user_id)
+        ).filter(Concept.document_id == document_id).scalar()
         
-        concepts = Concept.query.filter_by(document_id=document_id).all()
-        if not concepts:
-            return 0.0
-        
-        total_mastery = 0.0
-        count = 0
-        
-        for concept in concepts:
-            mastery = self.get_mastery_for_concept(user_id, concept.id)
-            total_mastery += mastery
-            count += 1
-        
-        return total_mastery / count if count > 0 else 0.0
+        return float(overall) if overall is not None else 0.0
 
@@ -1,8 +1,31 @@
-from extensions import db
+from cachetools import LRUCache
+from flask import current_app
+from sqlalchemy import event, insert
+from extensions import db, background_pool
 from models import RoadmapStep, MCQSet, MCQ
 from integrations.llm_client import LLMClient
 from config import Config
-import random
+import threading
+
+# Answer keys by mcq_set_id; a set's questions are written once, so every submit
+# after the first skips the query. Writes to MCQ rows evict their set below.
+_ANSWERS_CACHE = LRUCache(maxsize=4096)
+_ANSWERS_CACHE_LOCK = threading.Lock()
+
+
+@event.listens_for(MCQ, "after_insert")
+@event.listens_for(MCQ, "after_update")
+@event.listens_for(MCQ, "after_delete")
+def _evict_answers(mapper, connection, target):
+    with _ANSWERS_CACHE_LOCK:
+        _ANSWERS_CACHE.pop(target.mcq_set_id, None)
+
+
+# Background MCQ generations in flight, by roadmap_step_id. A request for a step
+# that is still being prefetched waits for that job instead of generating twice.
+_PENDING_SETS = {}
+_PENDING_SETS_LOCK = threading.Lock()
+
 
 class MCQService:
     """Service for generating and managing MCQ sets"""
@@ -23,13 +46,29 @@ class MCQService:
         Returns:
             MCQSet object with associated MCQ objects
         """
+        # Wait for an in-flight prefetch of this step; one still queued behind
+        # other background jobs is cancelled and the set generated here instead
+        with _PENDING_SETS_LOCK:
+            pending = _PENDING_SETS.get(roadmap_step_id)
+        if pending is not None:
+            if pending.cancel():
+                with _PENDING_SETS_LOCK:
+                    if _PENDING_SETS.get(roadmap_step_id) is pending:
+                        del _PENDING_SETS[roadmap_step_id]
+            else:
+                pending.result()
+        
+        return self._create_mcq_set(roadmap_step_id, concept_name, concept_description, document_context)
+    
+    def _create_mcq_set(self, roadmap_step_id, concept_name, concept_description, document_context=""):
+        """Return the step's MCQ set, generating and storing it if missing"""
         # Check if MCQ set already exists
         existing_set = MCQSet.query.filter_by(roadmap_step_id=roadmap_step_id).first()
         if existing_set:
             return existing_set
         
-        # Determine number of MCQs (5-10)
-        num_mcqs = random.randint(Config.MCQ_COUNT_MIN, Config.MCQ_COUNT_MAX)
+        # Determine number of MCQs (5-10); stable per step so the generation is cacheable
+        num_mcqs = Config.MCQ_COUNT_MIN + roadmap_step_id % (Config.MCQ_COUNT_MAX - Config.MCQ_COUNT_MIN + 1)
         
         # Generate MCQs using LLM
         mcqs_data = self.llm_client.generate_mcqs(
@@ -47,37 +86,96 @@ class MCQService:
         db.session.add(mcq_set)
         db.session.flush()  # Get ID
         
-        # Create MCQ objects
-        mcqs = []
-        for idx, mcq_data in enumerate(mcqs_data):
-            mcq = MCQ(
-                mcq_set_id=mcq_set.id,
-                question_number=idx + 1,
-                question_text=mcq_data["question"],
-                option_a=mcq_data["options"]["A"],
-                option_b=mcq_data["options"]["B"],
-                option_c=mcq_data["options"]["C"],
-                option_d=mcq_data["options"].get("D", ""),
-                correct_answer=mcq_data["correct_answer"].upper(),  # A, B, C, or D
-                explanation=mcq_data.get("explanation", "")
-            )
-            db.session.add(mcq)
-            mcqs.append(mcq)
+        # Create MCQs: one executemany INSERT instead of one INSERT per ORM add.
+        # Bulk inserts skip mapper events, which is fine here: a brand-new set
+        # has nothing in _ANSWERS_CACHE to evict.
+        rows = [
+            {
+                "mcq_set_id": mcq_set.id,
+                "question_number": idx + 1,
+                "question_text": mcq_data["question"],
+                "option_a": mcq_data["options"]["A"],
+                "option_b": mcq_data["options"]["B"],
+                "option_c": mcq_data["options"]["C"],
+                "option_d": mcq_data["options"].get("D", ""),
+                "correct_answer": mcq_data["correct_answer"].upper(),  # A, B, C, or D
+                "explanation": mcq_data.get("explanation", "")
+            }
+            for idx, mcq_data in enumerate(mcqs_data)
+        ]
+        if rows:
+            db.session.execute(insert(MCQ), rows)
         
-        db.session.commit()
+        # Caller commits
+        db.session.flush()
         return mcq_set
     
+    def prefetch_mcq_sets(self, roadmap_step_ids):
+        """
+        Generate MCQ sets for newly reachable steps on the background pool,
+        so the first MCQ request for those steps skips the LLM round trip
+        
+        Args:
+            roadmap_step_ids: IDs of roadmap steps to prepare
+        """
+        app = current_app._get_current_object()
+        with _PENDING_SETS_LOCK:
+            for step_id in roadmap_step_ids:
+                if step_id not in _PENDING_SETS:
+                    _PENDING_SETS[step_id] = background_pool.submit(self._prefetch_mcq_set, app, step_id)
+    
+    def _prefetch_mcq_set(self, app, roadmap_step_id):
+        """Background job body for prefetch_mcq_sets (own app context/session)"""
+        with app.app_context():
+            try:
+                step = RoadmapStep.query.get(roadmap_step_id)
+                if step and step.concept:
+                    self._create_mcq_set(
+                        roadmap_step_id=step.id,
+                        concept_name=step.concept.name,
+                        concept_description=step.concept.description or ""
+                    )
+                    db.session.commit()
+            except Exception as e:
+                # Best effort: the MCQ request generates the set itself on a miss
+                db.session.rollback()
+                app.logger.warning(f"MCQ prefetch failed for step {roadmap_step_id}: {str(e)}")
+            finally:
+                with _PENDING_SETS_LOCK:
+                    _PENDING_SETS.pop(roadmap_step_id, None)
+    
     def get_mcq_set_for_step(self, roadmap_step_id):
         """Get MCQ set for a roadmap step"""
-        mcq_set = MCQSet.query.filter_by(roadmap_step_id=roadmap_step_id).first()
-        if not mcq_set:
+        # Set and its questions in one round trip; outer join keeps an empty set visible.
+        # Answer and explanation columns are never selected for this payload.
+        first_set = (
+            db.session.query(MCQSet.id)
+            .filter_by(roadmap_step_id=roadmap_step_id)
+            .order_by(MCQSet.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        rows = db.session.query(
+            MCQSet.id.label("set_id"),
+            MCQSet.question_count,
+            MCQ.id,
+            MCQ.question_number,
+            MCQ.question_text,
+            MCQ.option_a,
+            MCQ.option_b,
+            MCQ.option_c,
+            MCQ.option_d
+        ).outerjoin(MCQ, MCQ.mcq_set_id == MCQSet.id).filter(
+            MCQSet.id == first_set
+        ).order_by(MCQ.question_number).all()
+        if not rows:
             return None
         
-        mcqs = MCQ.query.filter_by(mcq_set_id=mcq_set.id).order_by(MCQ.question_number).all()
+        mcqs = [row for row in rows if row.id is not None]
         
         return {
-            "id": mcq_set.id,
-            "question_count": mcq_set.question_count,
+            "id": rows[0].set_id,
+            "question_count": rows[0].question_count,
             "questions": [{
                 "id": mcq.id,
                 "question_number": mcq.question_number,
@@ -93,9 +191,17 @@ class MCQService:
         }
     
     def get_correct_answers(self, mcq_set_id):
-        """Get correct answers for grading (internal use)"""
-        mcqs = MCQ.query.filter_by(mcq_set_id=mcq_set_id).all()
-        return {mcq.question_number: mcq.correct_answer for mcq in mcqs}
+        """Get correct answers for grading (internal use, shared dict: do not mutate)"""
+        with _ANSWERS_CACHE_LOCK:
+            answers = _ANSWERS_CACHE.get(mcq_set_id)
+        if answers is None:
+            # Two columns only: grading never needs question text, options or explanations
+            rows = db.session.query(MCQ.question_number, MCQ.correct_answer).filter_by(mcq_set_id=mcq_set_id)
+            # Normalized once here instead of on every graded answer
+            answers = {number: answer.upper() for number, answer in rows if answer}
+            with _ANSWERS_CACHE_LOCK:
+                _ANSWERS_CACHE[mcq_set_id] = answers
+        return answers
     
     def get_explanations(self, mcq_set_id):
         """Get explanations for MCQs"""
@@ -1,6 +1,6 @@
 """Notes generation service"""
 from extensions import db
-from models import Note
+from models import Note, content_hash
 from integrations.llm_client import LLMClient
 
 
@@ -16,19 +16,29 @@ class NotesService:
         if note:
             return note
 
-        notes_data = self.llm_client.generate_notes(
-            concept_name=concept_name,
-            concept_description=concept_description,
-            document_context=document_context
-        )
+        # Reuse notes generated from identical inputs on another step before calling the LLM
+        key = content_hash(concept_name, concept_description, document_context)
+        shared = db.session.execute(
+            db.select(Note.summary, Note.explanation).where(Note.content_hash == key).limit(1)
+        ).first()
+        if shared is not None:
+            notes_data = {"summary": shared.summary, "explanation": shared.explanation}
+        else:
+            notes_data = self.llm_client.generate_notes(
+                concept_name=concept_name,
+                concept_description=concept_description,
+                document_context=document_context
+            )
 
         note = Note(
             roadmap_step_id=roadmap_step_id,
             summary=notes_data.get("summary", ""),
-            explanation=notes_data.get("explanation", "")
+            explanation=notes_data.get("explanation", ""),
+            content_hash=key
         )
         db.session.add(note)
-        db.session.commit()
+        # Caller commits (after reading the note, so it isn't expired and re-fetched)
+        db.session.flush()
         return note
 
     def get_notes_dict(self, roadmap_step_id):
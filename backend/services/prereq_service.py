@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert, select
 from extensions import db
-from models import Concept, PrereqEdge
+from models import Concept, PrereqEdge, StepProgress
 from integrations.llm_client import LLMClient
+from config import Config
 
 class PrereqService:
     """Service for inferring prerequisite relationships between concepts"""
@@ -43,15 +46,31 @@ class PrereqService:
         concept_name_to_id = {c.name: c.id for c in concepts}
         
         prereq_edges = []
+        all_concept_names = [c.name for c in concepts]
         
-        for concept in concepts:
-            # Try LLM inference first
-            llm_prereqs = self.llm_client.infer_prerequisites(
-                concept_name=concept.name,
-                concept_description=concept.description,
-                all_concepts=[c.name for c in concepts]
+        # Try LLM inference first; the per-concept calls are independent network
+        # round trips, so fan them out (bounded for API rate limits). Workers only
+        # see plain strings, never the session-bound Concept objects.
+        def _infer(name_and_description):
+            name, description = name_and_description
+            return self.llm_client.infer_prerequisites(
+                concept_name=name,
+                concept_description=description,
+                all_concepts=all_concept_names
             )
-            
+        
+        llm_inputs = [(c.name, c.description) for c in concepts]
+        with ThreadPoolExecutor(max_workers=Config.LLM_MAX_CONCURRENCY, thread_name_prefix="llm-prereqs") as pool:
+            llm_results = list(pool.map(_infer, llm_inputs))
+        
+        # Existing edges in one query rather than one lookup per candidate edge
+        seen_pairs = set(db.session.execute(
+            select(PrereqEdge.concept_id, PrereqEdge.prerequisite_id)
+            .where(PrereqEdge.concept_id.in_(list(concept_names)))
+        ).tuples())
+        rows = []
+        
+        for concept, llm_prereqs in zip(concepts, llm_results):
             # Use fallback if LLM returns few/no prereqs
             if len(llm_prereqs) < 2:
                 fallback_prereqs = self._get_fallback_prereqs(concept.name)
@@ -64,22 +83,22 @@ class PrereqService:
             for prereq_name in all_prereq_names[:4]:  # Limit to 2-4 prereqs
                 prereq_id = concept_name_to_id.get(prereq_name)
                 if prereq_id and prereq_id != concept.id:  # Avoid self-loops
-                    # Check if edge already exists
-                    existing = PrereqEdge.query.filter_by(
-                        concept_id=concept.id,
-                        prerequisite_id=prereq_id
-                    ).first()
-                    
-                    if not existing:
-                        edge = PrereqEdge(
-                            document_id=document_id,
-                            concept_id=concept.id,
-                            prerequisite_id=prereq_id
-                        )
-                        db.session.add(edge)
-                        prereq_edges.append(edge)
-        
-        db.session.commit()
+                    # Skip edges that already exist (or were queued above)
+                    if (concept.id, prereq_id) not in seen_pairs:
+                        seen_pairs.add((concept.id, prereq_id))
+                        rows.append({
+                            "document_id": document_id,
+                            "concept_id": concept.id,
+                            "prerequisite_id": prereq_id
+                        })
+        
+        if rows:
+            # Batched INSERT ... RETURNING (insertmanyvalues) instead of one INSERT per ORM add
+            prereq_edges = db.session.scalars(
+                insert(PrereqEdge).returning(PrereqEdge, sort_by_parameter_order=True),
+                rows
+            ).all()
+        
         return prereq_edges
     
     def _get_fallback_prereqs(self, concept_name):
@@ -118,8 +137,6 @@ class PrereqService:
         Returns:
             bool: True if all prerequisites are cleared
         """
-        from models import StepProgress
-        
         prereqs = self.get_prerequisites_for_concept(concept_id)
         
         for prereq in prereqs:
@@ -133,4 +150,42 @@ class PrereqService:
                 return False
         
         return True
+    
+    def get_concepts_with_prerequisites_cleared(self, concept_ids, user_id):
+        """
+        Batched check_prerequisites_cleared for many concepts at once
+        
+        Args:
+            concept_ids: IDs of the concepts to check
+            user_id: ID of the user
+        
+        Returns:
+            set: IDs of the concepts whose prerequisites are all cleared
+        """
+        concept_ids = set(concept_ids)
+        if not concept_ids:
+            return set()
+        
+        prereqs_by_concept = {}
+        for concept_id, prereq_id in db.session.execute(
+            db.select(PrereqEdge.concept_id, PrereqEdge.prerequisite_id)
+            .where(PrereqEdge.concept_id.in_(concept_ids))
+        ):
+            prereqs_by_concept.setdefault(concept_id, set()).add(prereq_id)
+        
+        all_prereq_ids = set().union(*prereqs_by_concept.values())
+        cleared_ids = set()
+        if all_prereq_ids:
+            cleared_ids = set(db.session.scalars(
+                db.select(StepProgress.concept_id).where(
+                    StepProgress.user_id == user_id,
+                    StepProgress.concept_id.in_(all_prereq_ids),
+                    StepProgress.status == "cleared"
+                )
+            ))
+        
+        return {
+            concept_id for concept_id in concept_ids
+            if prereqs_by_concept.get(concept_id, set()) <= cleared_ids
+        }
 
@@ -1,11 +1,19 @@
 """RAG service for Ask-Doc"""
+import hashlib
+import threading
 import numpy as np
+from cachetools import LRUCache
 from config import Config
 from models import Chunk
 from integrations.llm_client import LLMClient
 from services.embed_service import EmbedService
 from services.vector_store_service import VectorStoreService
 
+# Query vectors by (model, question digest); repeated questions skip the encoder
+# forward pass. Entries are read-only arrays shared between requests.
+_QUERY_EMBED_CACHE = LRUCache(maxsize=2048)
+_QUERY_EMBED_CACHE_LOCK = threading.Lock()
+
 
 class RagService:
     """Retrieve chunks and generate grounded answers with citations"""
@@ -17,9 +25,18 @@ class RagService:
 
     def _embed_query(self, query):
         """Embed query text"""
-        if self.embed_service.model:
-            return self.embed_service.model.encode([query])[0]
-        return np.random.rand(Config.EMBEDDING_DIMENSION)
+        if not self.embed_service.model:
+            return np.random.rand(Config.EMBEDDING_DIMENSION)
+        
+        key = (Config.EMBEDDING_MODEL, hashlib.sha1(query.encode("utf-8")).digest())
+        with _QUERY_EMBED_CACHE_LOCK:
+            embedding = _QUERY_EMBED_CACHE.get(key)
+        if embedding is None:
+            embedding = self.embed_service.model.encode([query])[0]
+            embedding.flags.writeable = False
+            with _QUERY_EMBED_CACHE_LOCK:
+                _QUERY_EMBED_CACHE[key] = embedding
+        return embedding
 
     def answer_question(self, document_id, question):
         """Search vectors and produce LLM answer with citations"""
@@ -29,11 +46,17 @@ class RagService:
             return {"answer": "No relevant context found.", "citations": []}
 
         chunk_ids = [r["chunk_id"] for r in results]
-        chunks = Chunk.query.filter(Chunk.id.in_(chunk_ids)).all()
+        # Only the columns the prompt needs (skips the embedding blob), indexed by id
+        chunks_by_id = {
+            row.id: row
+            for row in Chunk.query.with_entities(
+                Chunk.id, Chunk.chunk_text, Chunk.page_number, Chunk.slide_number
+            ).filter(Chunk.id.in_(chunk_ids))
+        }
 
         context_chunks = []
         for res in results:
-            chunk = next((c for c in chunks if c.id == res["chunk_id"]), None)
+            chunk = chunks_by_id.get(res["chunk_id"])
             if chunk:
                 context_chunks.append({
                     "chunk_id": chunk.id,
@@ -1,7 +1,9 @@
 from extensions import db
 from models import Document, Concept, RoadmapStep, PrereqEdge, StepProgress
 from services.prereq_service import PrereqService
-from collections import defaultdict, deque
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 class RoadmapService:
     """Service for building and managing learning roadmaps"""
@@ -25,72 +27,93 @@ class RoadmapService:
         if not concepts:
             raise ValueError(f"No concepts found for document {document_id}")
         
-        # Build dependency graph
-        graph = defaultdict(list)  # concept_id -> [dependent_concept_ids]
-        in_degree = defaultdict(int)  # concept_id -> number of prerequisites
-        
-        for concept in concepts:
-            in_degree[concept.id] = 0
+        # Build dependency graph over concept positions
+        n = len(concepts)
+        id_to_idx = {c.id: i for i, c in enumerate(concepts)}
+        graph = [[] for _ in range(n)]  # idx -> [dependent idxs]
+        in_degree = [0] * n  # idx -> number of prerequisites
         
         # Get all prerequisite edges
-        edges = PrereqEdge.query.filter_by(document_id=document_id).all()
-        for edge in edges:
-            graph[edge.prerequisite_id].append(edge.concept_id)
-            in_degree[edge.concept_id] += 1
-        
-        # Topological sort (Kahn's algorithm)
-        queue = deque()
-        for concept_id, degree in in_degree.items():
-            if degree == 0:
-                queue.append(concept_id)
-        
-        ordered_concept_ids = []
-        while queue:
-            concept_id = queue.popleft()
-            ordered_concept_ids.append(concept_id)
+        edges = db.session.execute(
+            db.select(PrereqEdge.prerequisite_id, PrereqEdge.concept_id)
+            .where(PrereqEdge.document_id == document_id)
+        )
+        for prerequisite_id, concept_id in edges:
+            src = id_to_idx.get(prerequisite_id)
+            dst = id_to_idx.get(concept_id)
+            if src is None or dst is None:
+                continue
+            graph[src].append(dst)
+            in_degree[dst] += 1
+        
+        # Topological sort (Kahn's algorithm); the order list doubles as the queue
+        order = [i for i in range(n) if in_degree[i] == 0]
+        processed = bytearray(n)
+        head = 0
+        while head < len(order):
+            idx = order[head]
+            head += 1
+            processed[idx] = 1
             
-            for dependent_id in graph[concept_id]:
-                in_degree[dependent_id] -= 1
-                if in_degree[dependent_id] == 0:
-                    queue.append(dependent_id)
+            for dependent in graph[idx]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    order.append(dependent)
         
-        # Handle cycles (if any concepts remain)
-        remaining_concepts = set(c.id for c in concepts) - set(ordered_concept_ids)
-        if remaining_concepts:
-            # Add remaining concepts at the end (they might have circular dependencies)
-            ordered_concept_ids.extend(remaining_concepts)
+        # Handle cycles: add remaining concepts at the end (circular dependencies)
+        order.extend(i for i in range(n) if not processed[i])
+        ordered_concept_ids = [concepts[i].id for i in order]
         
         # Create roadmap steps
+        concepts_by_id = {c.id: c for c in concepts}
+        existing_by_cid = {
+            s.concept_id: s
+            for s in RoadmapStep.query.filter_by(document_id=document_id).all()
+        }
+        
         roadmap_steps = []
+        new_rows = []
+        new_positions = []
+        order_updates = []
         step_order = 0
         
         for concept_id in ordered_concept_ids:
-            concept = next((c for c in concepts if c.id == concept_id), None)
-            if not concept:
+            if concept_id not in concepts_by_id:
                 continue
             
-            # Check if step already exists
-            existing_step = RoadmapStep.query.filter_by(
-                document_id=document_id,
-                concept_id=concept_id
-            ).first()
-            
+            existing_step = existing_by_cid.get(concept_id)
             if existing_step:
-                existing_step.order = step_order
+                if existing_step.order != step_order:
+                    order_updates.append({"id": existing_step.id, "order": step_order})
+                    # Keep the loaded instance in sync without marking it dirty
+                    set_committed_value(existing_step, "order", step_order)
                 roadmap_steps.append(existing_step)
             else:
-                step = RoadmapStep(
-                    document_id=document_id,
-                    concept_id=concept_id,
-                    order=step_order,
-                    step_type="concept"  # or "prerequisite" if needed
-                )
-                db.session.add(step)
-                roadmap_steps.append(step)
+                new_positions.append(len(roadmap_steps))
+                roadmap_steps.append(None)
+                new_rows.append({
+                    "document_id": document_id,
+                    "concept_id": concept_id,
+                    "order": step_order,
+                    "step_type": "concept"  # or "prerequisite" if needed
+                })
             
             step_order += 1
         
-        db.session.commit()
+        if order_updates:
+            # Bulk UPDATE by primary key (one executemany) for reordered steps
+            db.session.execute(update(RoadmapStep), order_updates)
+        
+        if new_rows:
+            # One batched INSERT ... RETURNING for all new steps
+            created = db.session.scalars(
+                insert(RoadmapStep).returning(RoadmapStep, sort_by_parameter_order=True),
+                new_rows
+            ).all()
+            for position, step in zip(new_positions, created):
+                roadmap_steps[position] = step
+        
+        db.session.flush()
         return roadmap_steps
     
     def get_roadmap_for_document(self, document_id, user_id=None):
@@ -104,7 +127,27 @@ class RoadmapService:
         Returns:
             List of roadmap step dicts with progress info
         """
-        steps = RoadmapStep.query.filter_by(document_id=document_id).order_by(RoadmapStep.order).all()
+        steps = (
+            RoadmapStep.query.options(joinedload(RoadmapStep.concept))
+            .filter_by(document_id=document_id)
+            .order_by(RoadmapStep.order)
+            .all()
+        )
+        
+        progress_map = {}
+        unlockable_ids = set()
+        if user_id and steps:
+            progress_map = {
+                p.roadmap_step_id: p
+                for p in StepProgress.query.filter(
+                    StepProgress.user_id == user_id,
+                    StepProgress.roadmap_step_id.in_([s.id for s in steps])
+                ).all()
+            }
+            unlockable_ids = self.prereq_service.get_concepts_with_prerequisites_cleared(
+                [s.concept_id for s in steps if s.id not in progress_map],
+                user_id
+            )
         
         roadmap_data = []
         for step in steps:
@@ -118,17 +161,14 @@ class RoadmapService:
             }
             
             if user_id:
-                progress = StepProgress.query.filter_by(
-                    user_id=user_id,
-                    roadmap_step_id=step.id
-                ).first()
+                progress = progress_map.get(step.id)
                 
                 if progress:
                     step_dict["status"] = progress.status
                     step_dict["mastery"] = progress.mastery_score
                 else:
                     # Check if prerequisites are cleared
-                    if self.prereq_service.check_prerequisites_cleared(step.concept_id, user_id):
+                    if step.concept_id in unlockable_ids:
                         step_dict["status"] = "unlocked"
                     else:
                         step_dict["status"] = "locked"
@@ -169,7 +209,12 @@ class RoadmapService:
             document_id: ID of the document
             user_id: ID of the user
             cleared_concept_id: ID of the concept that was just cleared
+        
+        Returns:
+            IDs of roadmap steps that became unlocked
         """
+        unlocked_step_ids = []
+        
         # Get concepts that depend on this one
         dependent_concepts = self.prereq_service.get_dependent_concepts(cleared_concept_id)
         
@@ -197,9 +242,13 @@ class RoadmapService:
                             status="unlocked"
                         )
                         db.session.add(progress)
+                        unlocked_step_ids.append(roadmap_step.id)
                     
                     elif progress.status == "locked":
                         progress.status = "unlocked"
+                        unlocked_step_ids.append(roadmap_step.id)
         
-        db.session.commit()
+        # Caller commits (grading writes attempt + progress in one transaction)
+        db.session.flush()
+        return unlocked_step_ids
 
@@ -1,7 +1,7 @@
 from extensions import db
 from models import RoadmapStep, Hint, StepProgress
 from integrations.llm_client import LLMClient
-from integrations.safety.anti_spoonfeed import AntiSpoonfeedFilter
+from integrations.safety.anti_spoonfeed import default_filter
 from config import Config
 
 class TutorService:
@@ -9,7 +9,7 @@ class TutorService:
     
     def __init__(self):
         self.llm_client = LLMClient()
-        self.anti_spoonfeed_filter = AntiSpoonfeedFilter()
+        self.anti_spoonfeed_filter = default_filter
     
     def get_hint(self, user_id, roadmap_step_id, hint_number, question_context=""):
         """
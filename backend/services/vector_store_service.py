@@ -1,57 +1,143 @@
 """Vector store service"""
-from pathlib import Path
+import os
+import threading
+from collections import OrderedDict
 from extensions import db
 from models import Document, Chunk
 from config import Config
 import numpy as np
 
+try:
+    import faiss
+    # One OpenMP pool per process for HNSW graph construction / search
+    faiss.omp_set_num_threads(int(os.environ.get("FAISS_OMP_THREADS", os.cpu_count() or 1)))
+except ImportError:
+    faiss = None
+
+# HNSW graph parameters (inner product over L2-normalized vectors == cosine)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+HNSW_SQ_TYPE = faiss.ScalarQuantizer.QT_8bit if faiss is not None else None
+
+# Rows fetched per round trip when streaming a document's embeddings
+CHUNK_LOAD_BATCH = 500
+
+# Loaded indices keyed by document id: (index mtime_ns, index, chunk ids)
+INDEX_CACHE_SIZE = 32
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def _load_index(document_id, index_path, chunk_map_path):
+    """Return (index, chunk_ids), re-reading from disk only when the index file changed"""
+    mtime_ns = index_path.stat().st_mtime_ns
+    with _INDEX_CACHE_LOCK:
+        cached = _INDEX_CACHE.get(document_id)
+        if cached is not None and cached[0] == mtime_ns:
+            _INDEX_CACHE.move_to_end(document_id)
+            return cached[1], cached[2]
+    
+    # Read fully into RAM: IO_FLAG_MMAP only maps IVF inverted lists, not HNSW/SQ
+    # storage. One copy per process, shared by all request threads via the cache.
+    index = faiss.read_index(str(index_path))
+    if chunk_map_path.suffix == ".bin":
+        chunk_ids = np.memmap(chunk_map_path, dtype=np.int64, mode='r')
+    else:
+        # Legacy .npy map written before the switch to raw int64
+        chunk_ids = np.load(str(chunk_map_path), mmap_mode='r')
+    # Indices built before the HNSW switch are plain L2 indices
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        faiss.ParameterSpace().set_index_parameter(index, "efSearch", HNSW_EF_SEARCH)
+    
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[document_id] = (mtime_ns, index, chunk_ids)
+        _INDEX_CACHE.move_to_end(document_id)
+        while len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    return index, chunk_ids
+
 class VectorStoreService:
     """Service for FAISS vector store operations"""
     
-    def build_index(self, document_id, chunks):
+    def __init__(self):
+        self._indices_root = Config.INDICES_FOLDER
+    
+    def _index_path(self, document_id):
+        """Path of a document's FAISS index"""
+        return self._indices_root / f"doc_{document_id}.index"
+    
+    def _chunkmap_path(self, document_id):
+        """Path of a document's raw int64 chunk-id map"""
+        return self._indices_root / f"doc_{document_id}_chunks.bin"
+    
+    def _legacy_chunkmap_path(self, document_id):
+        """Path of a chunk-id map written as .npy before the raw int64 format"""
+        return self._indices_root / f"doc_{document_id}_chunks.npy"
+    
+    def build_index(self, document_id):
         """
-        Build FAISS index for document chunks
+        Build FAISS index for a document's embedded chunks
         
         Args:
             document_id: ID of the document
-            chunks: List of Chunk objects with embeddings
         """
-        try:
-            import faiss
-        except ImportError:
+        if faiss is None:
             # FAISS not available, skip indexing
             return
         
-        if not chunks:
+        # One columnar query for (id, embedding) instead of touching ORM instances,
+        # streamed in batches so only the float32 matrix is held in full
+        embedded = (Chunk.document_id == document_id, Chunk.embedding.isnot(None))
+        total = db.session.scalar(db.select(db.func.count(Chunk.id)).where(*embedded))
+        if not total:
             return
-        
-        # Extract embeddings
-        embeddings = []
-        chunk_ids = []
-        
-        for chunk in chunks:
-            if chunk.embedding:
-                embeddings.append(chunk.embedding)
-                chunk_ids.append(chunk.id)
-        
-        if not embeddings:
+        rows = db.session.execute(
+            db.select(Chunk.id, Chunk.embedding)
+            .where(*embedded)
+            .order_by(Chunk.chunk_index)
+            .execution_options(yield_per=CHUNK_LOAD_BATCH)
+        )
+        
+        # Fill embeddings straight into a preallocated float32 matrix
+        embeddings_array = None
+        chunk_ids = np.empty(total, dtype=np.int64)
+        n = 0
+        for chunk_id, embedding in rows:
+            if not len(embedding) or n == total:
+                continue
+            if embeddings_array is None:
+                embeddings_array = np.empty((total, len(embedding)), dtype=np.float32)
+            embeddings_array[n] = embedding
+            chunk_ids[n] = chunk_id
+            n += 1
+        if not n:
             return
-        
-        # Convert to numpy array
-        embeddings_array = np.array(embeddings).astype('float32')
+        embeddings_array = embeddings_array[:n]
+        chunk_ids = chunk_ids[:n]
         dimension = embeddings_array.shape[1]
         
-        # Create FAISS index (L2 distance)
-        index = faiss.IndexFlatL2(dimension)
+        # Create FAISS index (cosine similarity via inner product on normalized vectors)
+        # with 8-bit scalar-quantized storage; the whole matrix goes in with a single
+        # train/add so construction runs on the OpenMP pool
+        faiss.normalize_L2(embeddings_array)
+        index = faiss.IndexHNSWSQ(dimension, HNSW_SQ_TYPE, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.train(embeddings_array)
         index.add(embeddings_array)
         
-        # Save index
-        index_path = Path(Config.INDICES_FOLDER) / f"doc_{document_id}.index"
-        faiss.write_index(index, str(index_path))
-        
-        # Save chunk ID mapping
-        chunk_map_path = Path(Config.INDICES_FOLDER) / f"doc_{document_id}_chunks.npy"
-        np.save(str(chunk_map_path), np.array(chunk_ids))
+        # Save chunk ID mapping, then the index; swap each file in atomically so
+        # the memory-mapped chunk map held by search() is never truncated underneath it
+        chunk_map_path = self._chunkmap_path(document_id)
+        tmp_map_path = chunk_map_path.with_name(chunk_map_path.name + ".tmp")
+        chunk_ids.tofile(str(tmp_map_path))
+        os.replace(tmp_map_path, chunk_map_path)
+        self._legacy_chunkmap_path(document_id).unlink(missing_ok=True)
+        
+        index_path = self._index_path(document_id)
+        tmp_index_path = index_path.with_name(index_path.name + ".tmp")
+        faiss.write_index(index, str(tmp_index_path))
+        os.replace(tmp_index_path, index_path)
     
     def search(self, document_id, query_embedding, top_k=None):
         """
@@ -65,39 +151,52 @@ class VectorStoreService:
         Returns:
             List of chunk IDs with similarity scores
         """
-        try:
-            import faiss
-        except ImportError:
+        if faiss is None:
             return []
         
         if top_k is None:
             top_k = Config.RAG_TOP_K
         
-        index_path = Path(Config.INDICES_FOLDER) / f"doc_{document_id}.index"
-        chunk_map_path = Path(Config.INDICES_FOLDER) / f"doc_{document_id}_chunks.npy"
+        index_path = self._index_path(document_id)
+        chunk_map_path = self._chunkmap_path(document_id)
+        if not chunk_map_path.exists():
+            chunk_map_path = self._legacy_chunkmap_path(document_id)
         
         if not index_path.exists() or not chunk_map_path.exists():
             return []
         
-        # Load index and chunk mapping
-        index = faiss.read_index(str(index_path))
-        chunk_ids = np.load(str(chunk_map_path))
+        # Load index and chunk mapping (cached across calls)
+        index, chunk_ids = _load_index(document_id, index_path, chunk_map_path)
         
         # Convert query to numpy array
         query_array = np.array([query_embedding]).astype('float32')
         
+        is_cosine = index.metric_type == faiss.METRIC_INNER_PRODUCT
+        if is_cosine:
+            faiss.normalize_L2(query_array)
+        
         # Search
         distances, indices = index.search(query_array, top_k)
         
-        # Return results
-        results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx < len(chunk_ids):
-                results.append({
-                    "chunk_id": int(chunk_ids[idx]),
-                    "distance": float(distance),
-                    "similarity": 1.0 / (1.0 + distance)  # Convert distance to similarity
-                })
-        
-        return results
+        # Drop padding (-1) / out-of-range hits, then assemble results from arrays
+        hits = indices[0]
+        valid = (hits >= 0) & (hits < len(chunk_ids))
+        hits = hits[valid]
+        scores = distances[0][valid]
+        if is_cosine:
+            # Inner product is a similarity; report cosine distance so "distance"
+            # keeps lower-is-closer semantics for callers
+            sims = scores
+            dists = 1.0 - scores
+        else:
+            # Legacy L2 index: FAISS already returns a distance
+            dists = scores
+            sims = 1.0 / (1.0 + dists)
+        
+        return [
+            {"chunk_id": cid, "distance": dist, "similarity": sim}
+            for cid, dist, sim in zip(
+                np.asarray(chunk_ids[hits]).tolist(), dists.tolist(), sims.tolist()
+            )
+        ]
 
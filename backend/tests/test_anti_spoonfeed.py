@@ -0,0 +1,28 @@
+"""Tests for the hint-mode anti-spoonfeeding policy"""
+import unittest
+
+from integrations.anti_spoonfeed import PolicyConfig, enforce_hint_policy
+
+
+class EnforceHintPolicyTest(unittest.TestCase):
+
+    def test_truncated_violating_hint_is_replaced(self):
+        # The sentence-boundary cut leaves this hint well under max_hint_chars,
+        # but it was truncated and carries a code block, so the fallback is used
+        text = "```py\nx = 1\n```\n" + "Think about what the loop does. " * 20 + "a" * 400
+        result = enforce_hint_policy(text, PolicyConfig(), hint_no=1)
+
+        self.assertIn("code_block_present", result.reasons)
+        self.assertIn("replaced_due_to_violation", result.reasons)
+        self.assertNotIn("```", result.text)
+
+    def test_short_clean_hint_is_kept(self):
+        text = "Think about what the loop counter does on each pass. What changes?"
+        result = enforce_hint_policy(text, PolicyConfig(), hint_no=1)
+
+        self.assertEqual(result.text, text)
+        self.assertNotIn("replaced_due_to_violation", result.reasons)
+
+
+if __name__ == "__main__":
+    unittest.main()